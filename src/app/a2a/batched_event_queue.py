@@ -0,0 +1,82 @@
+import asyncio
+from typing import List, Optional
+
+from a2a.server.events import Event, EventQueue
+
+
+class BatchedEventQueue:
+    """
+    Buffers events in front of an A2A EventQueue and forwards them in batches.
+    Uses two buffers (ping-pong): events are appended to the active buffer while the other one
+    is being drained into the EventQueue, the buffers are swapped on every flush.
+    """
+
+    def __init__(self, event_queue: EventQueue, max_batch_size: int = 16, max_delay: float = 0.05):
+        """
+        Initialize the batched event queue.
+
+        Args:
+            event_queue: EventQueue the events are forwarded to
+            max_batch_size: Number of buffered events that triggers a flush
+            max_delay: Seconds after the first buffered event before a flush is triggered
+        """
+        self._event_queue = event_queue
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._active: List[Event] = []
+        self._standby: List[Event] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self) -> "BatchedEventQueue":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.flush()
+
+    async def enqueue_event(self, event: Event) -> None:
+        """
+        Buffer an event, flushing when the batch is full.
+
+        Args:
+            event: Event to forward to the EventQueue
+        """
+        self._active.append(event)
+        if len(self._active) >= self._max_batch_size:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self._max_delay, self._schedule_flush)
+
+    def _schedule_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.create_task(self._timed_flush(self._flush_task))
+
+    async def _timed_flush(self, previous: Optional[asyncio.Task]) -> None:
+        # Chained after the previous timer flush so its failure reaches whoever awaits the latest one
+        if previous is not None:
+            await previous
+        await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Swap the buffers and drain every buffered event into the EventQueue, preserving order.
+        A timer flush still pending is awaited first and its error is raised here.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        flush_task = self._flush_task
+        if flush_task is not None and flush_task is not asyncio.current_task():
+            self._flush_task = None
+            await flush_task
+
+        async with self._flush_lock:
+            if not self._active:
+                return
+            self._active, self._standby = self._standby, self._active
+            batch = self._standby
+            for event in batch:
+                await self._event_queue.enqueue_event(event)
+            batch.clear()
@@ -1,73 +1,173 @@
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator
+
 import uvicorn
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.events import EventQueue
 from a2a.server.request_handlers import DefaultRequestHandler
 from a2a.server.tasks import InMemoryTaskStore
-from a2a.types import AgentCapabilities, AgentCard, Message, Role, Part, DataPart
+from a2a.types import AgentCapabilities, AgentCard, Message, Role, Part, DataPart, TaskState, TaskStatus, TaskStatusUpdateEvent
+from pydantic import ValidationError
+from starlette.applications import Starlette
 from starlette.middleware.cors import CORSMiddleware
-from uuid import uuid4
+from uuid import UUID
+from app.a2a.batched_event_queue import BatchedEventQueue
 from app.agent.run import main
 from app.utils.logging import logger
 from app.utils.settings import SETTINGS
 from app.agent.workflow_manager import WorkflowManager
 from app.utils.agent_message import AgentInputMessage
+from app.utils.agent_trace import TRACE_WRITER
+from app.utils.postgress import Postgress
+
+try:
+    import uvloop  # noqa: F401
+    UVICORN_LOOP = "uvloop"
+except ImportError:
+    # uvloop is not available on Windows, fall back to the default asyncio loop
+    UVICORN_LOOP = "asyncio"
+
+_AGENT_NAME = 'workflow_agent'
+_ROLE_AGENT = Role.agent
+_DATA_KIND = "data"
+_STREAM_METHOD = "message/stream"
+
+_PUBLIC_AGENT_CARD = AgentCard(
+    name='Workflow Agent',
+    description='An agent that executes workflow tasks and returns structured results',
+    url='http://localhost:8080',
+    version='1.0.0',
+    default_input_modes=['data'],
+    default_output_modes=['data'],
+    capabilities=AgentCapabilities(streaming=True),
+    skills=[],
+    supports_authenticated_extended_card=False,
+)
+
+_UUID_POOL_SIZE = 256
+_uuid_pool: deque = deque()
+
+
+def _next_uuid_hex() -> str:
+    """Return a random UUID4 hex string, refilling the pool from a single os.urandom call when empty.
+    The executor runs on a single event loop so the pool does not need a lock."""
+    if not _uuid_pool:
+        random_bytes = os.urandom(16 * _UUID_POOL_SIZE)
+        _uuid_pool.extend(UUID(bytes=random_bytes[i:i + 16], version=4).hex for i in range(0, len(random_bytes), 16))
+    return _uuid_pool.popleft()
+
+
+@asynccontextmanager
+async def lifespan(agent_executor: "WorkflowAgentExecutor", app: Starlette) -> AsyncIterator[None]:
+    """
+    Server lifespan, closes the long-lived MCP session, writes the queued trace rows and closes the database
+    pool on shutdown.
+
+    Args:
+        agent_executor: Executor whose workflow manager owns the shared MCP session
+        app: Starlette application being served
+    """
+    try:
+        yield
+    finally:
+        await agent_executor.workflow_manager.close()
+        await TRACE_WRITER.close()
+        await Postgress.close_pool()
+
 
 class WorkflowAgentExecutor(AgentExecutor):
     def __init__(self):
-        self.agent_name = 'workflow_agent'
-        
-        self.public_agent_card = AgentCard(
-            name='Workflow Agent',
-            description='An agent that executes workflow tasks and returns structured results',
-            url='http://localhost:8080',
-            version='1.0.0',
-            default_input_modes=['data'],
-            default_output_modes=['data'],
-            capabilities=AgentCapabilities(streaming=True),
-            skills=[],
-            supports_authenticated_extended_card=False,
-        )
+        self.public_agent_card = _PUBLIC_AGENT_CARD
         self.workflow_manager = WorkflowManager()
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         try:
-            method = context.call_context.state.get("method").strip()
-            logger.info(f"Received request with context_id: {context.context_id}, task_id: {context.task_id}, method: {method}")
+            call_state = context.call_context.state
+            method = (call_state.get("method") or "").strip()
+            logger.info("Received request with context_id: %s, task_id: %s, method: %s", context.context_id, context.task_id, method)
             
             # Extract data from the message parts and populate AgentInputMessage
             if context.message and context.message.parts and len(context.message.parts) > 0:
                 message_data = context.message.parts[0].root.data
                 
                 # Create AgentInputMessage from the extracted data
-                agent_input = AgentInputMessage(**message_data)
+                agent_input = AgentInputMessage.model_validate(message_data)
                 
 
-                agent_output = await main(agent_input=agent_input)
-                metadata = {}
-                metadata[self.agent_name]  = {
-                    "event_log": agent_output.event_log,
-                    "workflow_id": agent_input.workflow_id,
-                    "workflow_name": agent_output.workflow_name
-                }
+                # Events go through a batching buffer so multi-event responses share queue round trips
+                async with BatchedEventQueue(event_queue) as batched_queue:
+                    on_step_event = None
+                    if method == _STREAM_METHOD:
+                        # Stream each completed step while the workflow keeps running, the batching
+                        # buffer forwards them to the client on its own timer
+                        async def on_step_event(step_id: str, step_event: dict) -> None:
+                            await batched_queue.enqueue_event(self._build_step_event(agent_input, step_id, step_event))
+
+                    agent_output = await main(agent_input=agent_input, workflow_manager=self.workflow_manager, on_event=on_step_event)
+                    metadata = {
+                        _AGENT_NAME: {
+                            "event_log": agent_output.event_log,
+                            "workflow_id": agent_input.workflow_id,
+                            "workflow_name": agent_output.workflow_name
+                        }
+                    }
                 
-                part = Part(root=DataPart(kind="data", data=agent_output.model_dump(), metadata=metadata))
-                message = Message( role=Role.agent,
-                    message_id=str(uuid4()),
-                    task_id=agent_input.task_id,
-                    context_id=agent_input.context_id,
-                    parts = [part]
-                )
-
-                await event_queue.enqueue_event(message)
+                    # Every field of the outbound message is server generated, skip pydantic validation
+                    part = Part.model_construct(root=DataPart.model_construct(kind=_DATA_KIND, data=agent_output.model_dump(mode="json", exclude_none=True), metadata=metadata))
+                    message = Message.model_construct( role=_ROLE_AGENT,
+                        message_id=_next_uuid_hex(),
+                        task_id=agent_input.task_id,
+                        context_id=agent_input.context_id,
+                        parts = [part]
+                    )
+
+                    await batched_queue.enqueue_event(message)
                 
             else:
-                raise Exception("No message parts found in context")
+                raise ValueError("No message parts found in context")
 
+        except (ValidationError, ValueError) as e:
+            # Expected client errors (invalid payload, unknown workflow), no traceback needed
+            logger.warning("Bad request: %s", e)
+            raise
         except Exception as e:
             logger.error(f'Unexpected error: {e}', exc_info=True)
-            raise e
+            raise
+
 
+    def _build_step_event(self, agent_input: AgentInputMessage, step_id: str, step_event: dict) -> TaskStatusUpdateEvent:
+        """
+        Build a non-final working status event for a completed workflow step.
+
+        Args:
+            agent_input: Request message, the event carries its task and context ids like the final message
+            step_id: Id of the step that completed
+            step_event: task_state and output of the step
+
+        Returns:
+            TaskStatusUpdateEvent carrying the step output
+        """
+        part = Part.model_construct(root=DataPart.model_construct(kind=_DATA_KIND, data={
+            "step_id": step_id,
+            "task_state": step_event.get("task_state"),
+            "output": step_event.get("output")
+        }))
+        message = Message.model_construct(role=_ROLE_AGENT,
+            message_id=_next_uuid_hex(),
+            task_id=agent_input.task_id,
+            context_id=agent_input.context_id,
+            parts=[part]
+        )
+        return TaskStatusUpdateEvent.model_construct(kind="status-update",
+            task_id=agent_input.task_id,
+            context_id=agent_input.context_id,
+            status=TaskStatus.model_construct(state=TaskState.working, message=message),
+            final=False
+        )
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
         raise ValueError('cancel not supported')
@@ -77,14 +177,14 @@ class WorkflowAgentExecutor(AgentExecutor):
 if __name__ == '__main__':
     agent_name = SETTINGS.app_name
     
-    agent_executor = WorkflowAgentExecutor(agent_name)
+    agent_executor = WorkflowAgentExecutor()
     request_handler = DefaultRequestHandler(agent_executor=agent_executor, task_store=InMemoryTaskStore())
     server_app = A2AStarletteApplication(agent_card=agent_executor.public_agent_card, http_handler=request_handler)
-    app = server_app.build()
+    app = server_app.build(lifespan=partial(lifespan, agent_executor))
     app.add_middleware( CORSMiddleware,
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
         allow_credentials=True,
     )
-    uvicorn.run(app, host='0.0.0.0', port=8080)
+    uvicorn.run(app, host='0.0.0.0', port=8080, loop=UVICORN_LOOP, http="httptools")
@@ -1,14 +1,15 @@
+from typing import Optional
 
-
+from app.agent.workflow_executor import StepEventCallback
 from app.agent.workflow_manager import WorkflowManager
 from app.utils.agent_message import AgentInputMessage, AgentOutputMessage
 from app.utils.decorators import timed
 
 
 @timed("Pipeline Agent Worflow")
-async def main(agent_input: AgentInputMessage) -> AgentOutputMessage:
-    workflow_manager = WorkflowManager()
+async def main(agent_input: AgentInputMessage, workflow_manager: WorkflowManager, on_event: Optional[StepEventCallback] = None) -> AgentOutputMessage:
     agent_output=await workflow_manager.process_workflow(
-                    agent_input=agent_input
+                    agent_input=agent_input,
+                    on_event=on_event
                 )
     return agent_output
@@ -1,16 +1,18 @@
-import json
 import time
-from asyncio import Task
-from dataclasses import asdict, dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Tuple
-
-from a2a.server.events import EventQueue
-from a2a.types import Message, TaskState
+from dataclasses import dataclass, field, fields
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
 from app.utils.settings import SETTINGS
 
+if TYPE_CHECKING:
+    from asyncio import Task
+
+    from a2a.server.events import EventQueue
+
+_EMPTY_OUTPUT_JSON = "{}"
 
-@dataclass
+
+@dataclass(slots=True)
 class CubeAssistBaseState:
     """Base class containing core conversation fields"""
     input: Optional[str] = None
@@ -23,27 +25,7 @@ class CubeAssistBaseState:
     status: str = "in_progress"
 
 
-@dataclass
-class WorkflowState(CubeAssistBaseState):
-    """State for workflow execution"""
-    workflow_id: str = None
-    workflow_run_id: str = None
-    workflow_name: Optional[str] = None
-    worflow_exit_keywords: Optional[List[str]] = None
-    current_step_run_id: Optional[str] = None
-    workflow_state: Dict[str, Any] = field(default_factory=dict)
-    task_state: TaskState = TaskState.working.value
-    output: Dict[str, Any] = field(default_factory=dict)
-    step_ids: List[str] = field(default_factory=list)
-    next_step_ids: List[str] = field(default_factory=list)
-    start_step_id: Optional[str] = None
-    steps: List[Dict[str, Any]] = field(default_factory=list)
-    run_id: Optional[str] = None
-    user_id: str = None
-    user_roles: Tuple[str, ...] = field(default_factory=tuple)
-
-
-@dataclass
+@dataclass(slots=True)
 class AgentState(CubeAssistBaseState):
     """Agent state extending CubeAssist base state"""
     # for agent workflow state
@@ -59,8 +41,8 @@ class AgentState(CubeAssistBaseState):
     
     # for agent context
     task_id: Optional[str] = None
-    task: Optional[Task] = None
-    event_queue: EventQueue = None
+    task: Optional["Task"] = None
+    event_queue: Optional["EventQueue"] = None
     start_time: Optional[float] = None
     end_time: Optional[float] = None
     call_back_function: Optional[Callable] = None
@@ -76,26 +58,20 @@ class AgentState(CubeAssistBaseState):
         self.end_time = time.time()
 
     def to_dict(self) -> dict:
-        return asdict(self)
+        # Shallow on purpose, asdict() would deep copy messages/results/conversation on every call
+        return {f.name: getattr(self, f.name) for f in fields(self)}
 
     @staticmethod
     def get_initial_state():
+        # Fields left out already match the dataclass defaults (default_factory gives fresh
+        # messages/event_log/results lists), only the per-run values are passed explicitly
         return AgentState(
-            messages=[],
-            input=None,
-            output=json.dumps({}),
-            event_log=[],
+            output=_EMPTY_OUTPUT_JSON,
             available_tools=[],
             agent_tools=[],
-            selected_tool=None,
-            results=[],
             token="",
-            step=0,
             seen_decisions=set(),
-            status="in_progress",
             agent_name=SETTINGS.app_name,
-            context_id=None,
-            is_new_conversation=True,
             conversation=[],
             current_state={},
             start_time=time.time()
@@ -1,30 +1,183 @@
+import asyncio
+import copy
 import uuid
-import json
 from datetime import datetime
-from functools import wraps
-from typing import Dict, Any, Optional, Callable
+from functools import partial, wraps
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from app.utils.logging import logger
 from app.utils.postgress import Postgress
-from app.agent.wokflow_state import WorkflowState
+from app.agent.workflow_state import WorkflowState
 from a2a.types import TaskState
 
+# (status, success_response, error_response) recorded for a finished step
+StatusResult = Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+# Statements are module constants so asyncpg prepares each one once per connection and reuses it
+
+# Initial upsert with RUNNING status
+_INITIAL_UPSERT_SQL = """
+    INSERT INTO workflow_run (
+        workflow_run_id, step_run_id, workflow_id, step_id, 
+        started_at, status, workflow_state, 
+        created_at, created_by
+    ) VALUES (
+        $1, $2, $3, $4, $5, $6, $7, $8, $9
+    )
+    ON CONFLICT (step_run_id) 
+    DO UPDATE SET
+        started_at = EXCLUDED.started_at,
+        status = EXCLUDED.status,
+        workflow_state = EXCLUDED.workflow_state,
+        updated_at = EXCLUDED.created_at,
+        updated_by = EXCLUDED.created_by
+"""
+
+# Final upsert with completion details
+_COMPLETION_UPSERT_SQL = """
+    INSERT INTO workflow_run (
+        workflow_run_id, step_run_id, workflow_id, step_id, 
+        started_at, completed_at, status, 
+        workflow_state, success_response, error_response,
+        created_at, created_by, updated_at, updated_by
+    ) VALUES (
+        $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14
+    )
+    ON CONFLICT (step_run_id) 
+    DO UPDATE SET
+        completed_at = EXCLUDED.completed_at,
+        status = EXCLUDED.status,
+        workflow_state = EXCLUDED.workflow_state,
+        success_response = EXCLUDED.success_response,
+        error_response = EXCLUDED.error_response,
+        updated_at = EXCLUDED.updated_at,
+        updated_by = EXCLUDED.updated_by
+"""
+
+# Final write when the RUNNING row is known to exist, only the workflow_state keys the step changed ($4)
+# or removed ($3) are sent and merged into the stored jsonb
+_COMPLETION_DELTA_SQL = """
+    UPDATE workflow_run SET
+        completed_at = $2,
+        status = $5,
+        workflow_state = (COALESCE(workflow_state, '{}'::jsonb) - $3::text[]) || $4::jsonb,
+        success_response = $6,
+        error_response = $7,
+        updated_at = $2,
+        updated_by = $8
+    WHERE step_run_id = $1
+"""
+
+# Error write, stores the error workflow state in the workflow_state column
+_ERROR_UPSERT_SQL = """
+    INSERT INTO workflow_run (
+        workflow_run_id, step_run_id, workflow_id, step_id, 
+        started_at, completed_at, status, 
+        workflow_state, error_response,
+        created_at, created_by, updated_at, updated_by
+    ) VALUES (
+        $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13
+    )
+    ON CONFLICT (step_run_id) 
+    DO UPDATE SET
+        completed_at = EXCLUDED.completed_at,
+        status = EXCLUDED.status,
+        workflow_state = EXCLUDED.workflow_state,
+        error_response = EXCLUDED.error_response,
+        updated_at = EXCLUDED.updated_at,
+        updated_by = EXCLUDED.updated_by
+"""
+
+# TaskState values resolved once, the wrapper runs for every step
+_WORKING = TaskState.working.value
+_FAILED = TaskState.failed.value
+_CANCELED = TaskState.canceled.value
+_INPUT_REQUIRED = TaskState.input_required.value
+_COMPLETED = TaskState.completed.value
+
+
+def _state_delta(before: Dict[str, Any], after: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Top-level keys of the workflow state a step set or removed. before must be a deep snapshot, a value the
+    step mutated in place is then unequal to it; the identity check settles unchanged immutable values.
+    """
+    changed = {
+        key: value for key, value in after.items()
+        if key not in before or (before[key] is not value and before[key] != value)
+    }
+    removed = [key for key in before if key not in after]
+    return changed, removed
+
+
+def _failed_status(step_id: str, step_detail: Dict[str, Any], result_state: WorkflowState, workflow_run_id: str, step_run_id: str) -> StatusResult:
+    error_response = {
+        "error": result_state.output,
+        "step_id": step_id,
+        "workflow_run_id": workflow_run_id,
+        "step_run_id": step_run_id
+    }
+    result_state.workflow_state["execution_phase"] = "FAILED"
+    return _FAILED, None, error_response
+
+
+def _success_response(status: str, step_id: str, step_detail: Dict[str, Any], result_state: WorkflowState,
+                      workflow_run_id: str, step_run_id: str, include_next_step: bool = True) -> Dict[str, Any]:
+    response = {"success": True, "step_completed": step_id}
+    if include_next_step:
+        response["next_step"] = step_detail.get("next_step_id")
+    response["workflow_run_id"] = workflow_run_id
+    response["step_run_id"] = step_run_id
+    response["step_output"] = result_state.output
+    response["status"] = status
+    return response
+
+
+def _canceled_status(step_id: str, step_detail: Dict[str, Any], result_state: WorkflowState, workflow_run_id: str, step_run_id: str) -> StatusResult:
+    success_response = _success_response(_CANCELED, step_id, step_detail, result_state, workflow_run_id, step_run_id,
+                                          include_next_step=False)
+    result_state.workflow_state["execution_phase"] = "CANCELED"
+    return _CANCELED, success_response, None
+
+
+def _success_status(status: str, step_id: str, step_detail: Dict[str, Any], result_state: WorkflowState, workflow_run_id: str, step_run_id: str) -> StatusResult:
+    # working (still in progress), input-required (waiting for user input) and completed steps
+    return status, _success_response(status, step_id, step_detail, result_state, workflow_run_id, step_run_id), None
+
+
+_completed_status = partial(_success_status, _COMPLETED)
+
+
+# Row status and success/error responses per step task state value
+_STATUS_HANDLERS: Dict[str, Callable[..., StatusResult]] = {
+    _FAILED: _failed_status,
+    _CANCELED: _canceled_status,
+    _WORKING: partial(_success_status, _WORKING),
+    _INPUT_REQUIRED: partial(_success_status, _INPUT_REQUIRED),
+}
+
+
+_DEFAULT_POSTGRESS: Optional[Postgress] = None
+
+
+def _default_postgress() -> Postgress:
+    global _DEFAULT_POSTGRESS
+    if _DEFAULT_POSTGRESS is None:
+        _DEFAULT_POSTGRESS = Postgress()
+    return _DEFAULT_POSTGRESS
+
 
 def process_workflow_run(db: Optional[Postgress] = None):
     """
     Decorator to persist workflow step execution to workflow_run table using upsert.
     
     Args:
-        db: Optional Postgress instance, creates new if not provided
+        db: Optional Postgress instance, the shared module instance is used if not provided
     """
     def decorator(func: Callable) -> Callable:
+        # Resolved once per decorated step handler, connections come from the process-wide pool
+        database = db if db is not None else _default_postgress()
+
         @wraps(func)
-        async def wrapper(self, step_detail: Dict[str, Any], workflow_state: WorkflowState) -> WorkflowState:
-            # Initialize database connection if not provided
-            if db is None:
-                database = Postgress()
-            else:
-                database = db
-            
+        async def wrapper(self, step_detail: Dict[str, Any], workflow_state: WorkflowState, **kwargs) -> WorkflowState:
             # Extract step and workflow information from WorkflowState fields
             step_id = step_detail.get("step_id")
             workflow_id = workflow_state.workflow_id
@@ -37,26 +190,10 @@ def process_workflow_run(db: Optional[Postgress] = None):
             
             started_at = datetime.now()
             
-            # Initial upsert with RUNNING status - removed schema reference
-            initial_upsert_query = """
-            INSERT INTO workflow_run (
-                workflow_run_id, step_run_id, workflow_id, step_id, 
-                started_at, status, workflow_state, 
-                created_at, created_by
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
-            ON CONFLICT (step_run_id) 
-            DO UPDATE SET
-                started_at = EXCLUDED.started_at,
-                status = EXCLUDED.status,
-                workflow_state = EXCLUDED.workflow_state,
-                updated_at = EXCLUDED.created_at,
-                updated_by = EXCLUDED.created_by
-            """
-            
-            # Prepare initial workflow state (before step execution) - only workflow_state data
-            initial_workflow_state = workflow_state.workflow_state
+            # Prepare initial workflow state (before step execution) - only workflow_state data. Deep-copied because
+            # the background write encodes it while the step is already updating the state, and the completion
+            # delta must see nested values the step changes in place
+            initial_workflow_state = copy.deepcopy(workflow_state.workflow_state)
             
             initial_params = (
                 workflow_run_id,
@@ -64,128 +201,83 @@ def process_workflow_run(db: Optional[Postgress] = None):
                 workflow_id,
                 step_id,
                 started_at,
-                TaskState.working.value,  # 'working'
-                json.dumps(initial_workflow_state),
+                _WORKING,  # 'working'
+                initial_workflow_state,
                 started_at,
                 "system"
             )
             
+            # The RUNNING row is only there for visibility while the step executes, write it in the
+            # background so it overlaps the step instead of blocking it, the terminal write completes it
+            initial_write = asyncio.create_task(database.execute(_INITIAL_UPSERT_SQL, *initial_params))
+
+            async def await_initial_write() -> bool:
+                # Must land before the terminal write, otherwise it would reset the row back to RUNNING
+                try:
+                    await initial_write
+                    logger.info(f"Created/updated workflow run record - Workflow: {workflow_run_id}, Step: {workflow_state.current_step_run_id}")
+                    return True
+                except Exception as write_error:
+                    logger.warning(f"Initial workflow run record write failed for step {step_id}: {write_error}")
+                    return False
+
             try:
-                # Insert/update initial record
-                database.execute_query(initial_upsert_query, initial_params, fetch=False)
-                logger.info(f"Created/updated workflow run record - Workflow: {workflow_run_id}, Step: {workflow_state.current_step_run_id}")
-                
                 # Execute the original function
-                result_state = await func(self, step_detail, workflow_state)
+                try:
+                    result_state = await func(self, step_detail, workflow_state, **kwargs)
+                finally:
+                    initial_written = await await_initial_write()
 
                 
                 # Prepare final workflow state (after step execution) - only workflow_state data
                 final_workflow_state = result_state.workflow_state
                 
-                # Determine execution status using TaskState enum values
-                status = TaskState.completed.value  # 'completed' - default to completed
-                success_response = None
-                error_response = None
-                
-                # Check if step failed
-                if hasattr(result_state, 'task_state') and result_state.task_state == TaskState.failed.value:
-                    status = TaskState.failed.value  # 'failed'
-                    error_response = {
-                        "error": result_state.output,  
-                        "step_id": step_id,
-                        "workflow_run_id": workflow_run_id,
-                        "step_run_id": workflow_state.current_step_run_id
-                    }
-                    final_workflow_state["execution_phase"] = "FAILED"
-                elif hasattr(result_state, 'task_state') and result_state.task_state == TaskState.canceled.value:
-                    status = TaskState.canceled.value  # 'canceled'
-                    success_response = {
-                        "success": True,
-                        "step_completed": step_id,
-                        "workflow_run_id": workflow_run_id,
-                        "step_run_id": workflow_state.current_step_run_id,
-                        "step_output": result_state.output,
-                        "status": "canceled"
-                    }
-                    final_workflow_state["execution_phase"] = "CANCELED"
-                elif hasattr(result_state, 'task_state') and result_state.task_state == TaskState.working.value:
-                    status = TaskState.working.value  # 'working'
-                    success_response = {
-                        "success": True,
-                        "step_completed": step_id,
-                        "next_step": step_detail.get("next_step_id"),
-                        "workflow_run_id": workflow_run_id,
-                        "step_run_id": workflow_state.current_step_run_id,
-                        "step_output": result_state.output,  
-                        "status": "working"  # Still in progress
-                    }
-                elif hasattr(result_state, 'task_state') and result_state.task_state == TaskState.input_required:
-                    status = TaskState.input_required.value  # 'input-required'
-                    success_response = {
-                        "success": True,
-                        "step_completed": step_id,
-                        "next_step": step_detail.get("next_step_id"),
-                        "workflow_run_id": workflow_run_id,
-                        "step_run_id": workflow_state.current_step_run_id,
-                        "step_output": result_state.output,  
-                        "status": "input-required"  # Waiting for user input
-                    }
-                else:
-                    # Step completed successfully
-                    status = TaskState.completed.value  # 'completed'
-                    success_response = {
-                        "success": True,
-                        "step_completed": step_id,
-                        "next_step": step_detail.get("next_step_id"),
-                        "workflow_run_id": workflow_run_id,
-                        "step_run_id": workflow_state.current_step_run_id,
-                        "step_output": result_state.output,  
-                        "status": "completed"
-                    }
-                
-                # Final upsert with completion details - removed schema reference
-                completion_upsert_query = """
-                INSERT INTO workflow_run (
-                    workflow_run_id, step_run_id, workflow_id, step_id, 
-                    started_at, completed_at, status, 
-                    workflow_state, success_response, error_response,
-                    created_at, created_by, updated_at, updated_by
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                # Determine execution status from the TaskState value, handlers set either the enum member or its
+                # value so normalize once, anything unrecognized counts as completed
+                task_state = getattr(result_state, 'task_state', _COMPLETED)
+                task_state = getattr(task_state, 'value', task_state)
+                status_handler = _STATUS_HANDLERS.get(task_state, _completed_status)
+                status, success_response, error_response = status_handler(
+                    step_id, step_detail, result_state, workflow_run_id, workflow_state.current_step_run_id
                 )
-                ON CONFLICT (step_run_id) 
-                DO UPDATE SET
-                    completed_at = EXCLUDED.completed_at,
-                    status = EXCLUDED.status,
-                    workflow_state = EXCLUDED.workflow_state,
-                    success_response = EXCLUDED.success_response,
-                    error_response = EXCLUDED.error_response,
-                    updated_at = EXCLUDED.updated_at,
-                    updated_by = EXCLUDED.updated_by
-                """
                 
                 completed_at = datetime.now()
-                completion_params = (
-                    workflow_run_id,
-                    workflow_state.current_step_run_id,
-                    workflow_id,
-                    step_id,
-                    started_at,
-                    completed_at,
-                    status,  # Now uses correct TaskState enum value
-                    json.dumps(final_workflow_state),
-                    json.dumps(success_response) if success_response else None,
-                    json.dumps(error_response) if error_response else None,
-                    started_at,  
-                    "system",    
-                    completed_at,  
-                    "system"
-                )
-                
-                database.execute_query(completion_upsert_query, completion_params, fetch=False)
+                # With the RUNNING row in place only the state delta is written, the full row otherwise
+                completion_status = None
+                if initial_written:
+                    changed_state, removed_keys = _state_delta(initial_workflow_state, final_workflow_state)
+                    completion_status = await database.execute(
+                        _COMPLETION_DELTA_SQL,
+                        workflow_state.current_step_run_id,
+                        completed_at,
+                        removed_keys,
+                        changed_state,
+                        status,
+                        success_response,
+                        error_response,
+                        "system"
+                    )
+                if completion_status != "UPDATE 1":
+                    completion_params = (
+                        workflow_run_id,
+                        workflow_state.current_step_run_id,
+                        workflow_id,
+                        step_id,
+                        started_at,
+                        completed_at,
+                        status,  # TaskState value
+                        final_workflow_state,
+                        success_response,
+                        error_response,
+                        started_at,  
+                        "system",    
+                        completed_at,  
+                        "system"
+                    )
+                    await database.execute(_COMPLETION_UPSERT_SQL, *completion_params)
                 logger.info(f"Completed workflow run record - Step: {workflow_state.current_step_run_id} with status: {status}")
                 
-                if result_state.task_state != TaskState.input_required:
+                if task_state != _INPUT_REQUIRED:
                     result_state.current_step_run_id = str(uuid.uuid4())
                 return result_state
                 
@@ -206,7 +298,7 @@ def process_workflow_run(db: Optional[Postgress] = None):
                 # Error workflow state - store in workflow_state column (not output_workflow_state)
                 error_workflow_state = {
                    "inputs": workflow_state.workflow_state,
-                    "status": TaskState.failed.value,  # 'failed'
+                    "status": _FAILED,  # 'failed'
                     "output": workflow_state.output,
                     "step_ids": workflow_state.step_ids,
                     "next_step_ids": workflow_state.next_step_ids,
@@ -218,26 +310,6 @@ def process_workflow_run(db: Optional[Postgress] = None):
                     "error_details": error_data
                 }
                 
-                # Error upsert - removed output_workflow_state column and schema reference
-                error_upsert_query = """
-                INSERT INTO workflow_run (
-                    workflow_run_id, step_run_id, workflow_id, step_id, 
-                    started_at, completed_at, status, 
-                    workflow_state, error_response,
-                    created_at, created_by, updated_at, updated_by
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                )
-                ON CONFLICT (step_run_id) 
-                DO UPDATE SET
-                    completed_at = EXCLUDED.completed_at,
-                    status = EXCLUDED.status,
-                    workflow_state = EXCLUDED.workflow_state,
-                    error_response = EXCLUDED.error_response,
-                    updated_at = EXCLUDED.updated_at,
-                    updated_by = EXCLUDED.updated_by
-                """
-                
                 error_params = (
                     workflow_run_id,
                     workflow_state.current_step_run_id,
@@ -245,16 +317,16 @@ def process_workflow_run(db: Optional[Postgress] = None):
                     step_id,
                     started_at,
                     completed_at,
-                    TaskState.failed.value,  # 'failed'
-                    json.dumps(error_workflow_state),  # Store in workflow_state column
-                    json.dumps(error_data),
+                    _FAILED,  # 'failed'
+                    error_workflow_state,  # Store in workflow_state column
+                    error_data,
                     started_at,  # created_at
                     "system",    # created_by
                     completed_at,  # updated_at
                     "system"     # updated_by
                 )
                 
-                database.execute_query(error_upsert_query, error_params, fetch=False)
+                await database.execute(_ERROR_UPSERT_SQL, *error_params)
                 logger.info(f"Updated workflow run record: {workflow_state.current_step_run_id} with ERROR status")
 
                 raise e
@@ -1,21 +1,223 @@
-from functools import partial
-import json
-from typing import Dict, Any, Optional
-from jinja2 import Environment, meta
+import ast
+from contextlib import AsyncExitStack
+from dataclasses import replace
+from functools import lru_cache, partial
+import operator
+from types import MappingProxyType
+import orjson
+from typing import Dict, Any, List, Mapping, NamedTuple, Optional, Callable, Awaitable, Set, Tuple
+from contextvars import ContextVar
+from jinja2 import Environment, TemplateSyntaxError, Undefined, UndefinedError, meta
+from jinja2.utils import missing
 from langgraph.graph import StateGraph, START, END
+from langgraph.graph.state import CompiledStateGraph
 from a2a.types import TaskState
-from app.models.validation_rule import ValidationRuleItem
 from app.utils.decorators import timed
 from app.utils.logging import logger
 from app.utils.settings import SETTINGS
+from app.utils.ttl_cache import TTLCache
 from app.utils.utilities import Utilities
-from app.agent.wokflow_state import WorkflowState
+from app.agent.workflow_state import WorkflowState
 import httpx
+import uuid
 from app.agent.workflow_decorators import process_workflow_run
+from app.mcp.session_owner import SessionOwner
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
 import asyncio
 
+# Called with the step id and the step's outcome, its task_state and output
+StepEventCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# Names of the context variables a condition render found missing, set only while rendering a condition
+_missing_template_vars: ContextVar[Optional[Set[str]]] = ContextVar("_missing_template_vars", default=None)
+
+
+class _MissingTrackingUndefined(Undefined):
+    """Undefined that records top-level variables missing from the render context."""
+    __slots__ = ()
+
+    def __init__(self, hint=None, obj=missing, name=None, exc=UndefinedError):
+        super().__init__(hint, obj, name, exc)
+        tracked = _missing_template_vars.get()
+        if tracked is not None and obj is missing and name is not None:
+            tracked.add(name)
+
+
+def _parse_rendered_output(rendered_template: str) -> Any:
+    """
+    Parse a rendered user message as JSON, plain text is wrapped as a summary.
+
+    Only text starting with { or [ is handed to the JSON parser so plain text skips the failed parse.
+    """
+    if rendered_template.lstrip()[:1] in ("{", "["):
+        try:
+            return orjson.loads(rendered_template)
+        except orjson.JSONDecodeError:
+            pass
+    return {"summary": rendered_template}
+
+
+# Shared environment, templates compiled from it are cached on the step definitions
+_JINJA_ENV = Environment(autoescape=False, cache_size=-1, auto_reload=False, undefined=_MissingTrackingUndefined)
+
+
+def _render_condition(template, context: Dict[str, Any]) -> Tuple[Optional[str], Set[str]]:
+    """
+    Render a condition template and collect the variables missing from the context in the same pass.
+
+    Args:
+        template: Compiled Jinja template of the condition
+        context: Variables available to the condition
+
+    Returns:
+        Rendered condition (None when a missing variable made rendering fail) and the missing variable names
+    """
+    missing_vars: Set[str] = set()
+    token = _missing_template_vars.set(missing_vars)
+    try:
+        return template.render(context), missing_vars
+    except UndefinedError:
+        if missing_vars:
+            return None, missing_vars
+        raise
+    finally:
+        _missing_template_vars.reset(token)
+
+# Compiled workflow definitions kept per executor
+_GRAPH_CACHE_SIZE = 32
+
+
+class CompiledRule(NamedTuple):
+    """Orchestration rule condition compiled at graph build time."""
+    # Jinja template for conditions written as templates, None for pure-Python conditions
+    template: Any
+    # Variable names the condition reads
+    variables: frozenset
+    # Code object of a pure-Python condition (eval() fallback)
+    code: Any
+    # Parsed expression for the restricted interpreter, None when it uses unsupported expressions
+    tree: Optional[ast.expr]
+
+
+class CompiledStep(NamedTuple):
+    """Templates, rule conditions and mappings of a step, compiled once per workflow definition."""
+    user_message_template: Any
+    # Index-aligned with the step's orchestration rules, None for a rule that could not be compiled
+    rules: Tuple[Optional[CompiledRule], ...]
+    # (key, json_path, parsed path, escape) of the success mappings followed by the output mappings
+    mappings: Tuple[Tuple[str, Any, Any, bool], ...]
+
+
+class _CachedDefinition(NamedTuple):
+    # Kept so the identity the cache is keyed on stays valid
+    steps: List[Dict[str, Any]]
+    compiled_steps: Dict[str, CompiledStep]
+    # Compiled graph per start step
+    graphs: Dict[Optional[str], CompiledStateGraph]
+
+# Escapes a string for embedding between the quotes of a JSON string (templates render mapped values into JSON)
+_JSON_STR_ESCAPE = str.maketrans({
+    **{chr(code): f"\\u{code:04x}" for code in range(0x20)},
+    "\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"
+})
+
+_INPUT_REQUIRED = TaskState.input_required.value
+_STOPPED_STATES = frozenset((TaskState.failed.value, TaskState.canceled.value))
+
+# Answers to a confirm_action prompt that cancel the workflow
+_DECLINE_ANSWERS = frozenset(("no", "n"))
+
+# Conditions are evaluated without builtins, only the workflow state variables are in scope
+_SAFE_EVAL_GLOBALS = {"__builtins__": {}}
+
+
+class _NameCollector(ast.NodeVisitor):
+    """Collects the variable names loaded by a Python expression."""
+
+    def __init__(self):
+        self.names = set()
+
+    def visit_Name(self, node: ast.Name) -> None:
+        self.names.add(node.id)
+
+
+def _is_jinja_condition(condition: str) -> bool:
+    return "{{" in condition or "{%" in condition
+
+
+# Restricted interpreter for the condition shapes rules use: literals, variables, comparisons,
+# membership, and/or/not. Anything else falls back to eval().
+_COMPARE_OPS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda left, right: left in right,
+    ast.NotIn: lambda left, right: left not in right,
+    ast.Is: operator.is_,
+    ast.IsNot: operator.is_not,
+}
+_UNARY_OPS = {ast.Not: operator.not_, ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _eval_node(node: ast.expr, context: Mapping[str, Any]) -> Any:
+    return _NODE_EVALUATORS[type(node)](node, context)
+
+
+def _eval_compare(node: ast.Compare, context: Mapping[str, Any]) -> bool:
+    left = _eval_node(node.left, context)
+    for op, comparator in zip(node.ops, node.comparators):
+        right = _eval_node(comparator, context)
+        if not _COMPARE_OPS[type(op)](left, right):
+            return False
+        left = right
+    return True
+
+
+def _eval_bool_op(node: ast.BoolOp, context: Mapping[str, Any]) -> Any:
+    # Short-circuits and returns the deciding operand, like Python's and/or
+    stop_on_falsy = isinstance(node.op, ast.And)
+    value = None
+    for operand in node.values:
+        value = _eval_node(operand, context)
+        if bool(value) is not stop_on_falsy:
+            return value
+    return value
+
+
+_NODE_EVALUATORS = {
+    ast.Constant: lambda node, context: node.value,
+    ast.Name: lambda node, context: context[node.id],
+    ast.Compare: _eval_compare,
+    ast.BoolOp: _eval_bool_op,
+    ast.UnaryOp: lambda node, context: _UNARY_OPS[type(node.op)](_eval_node(node.operand, context)),
+    ast.List: lambda node, context: [_eval_node(item, context) for item in node.elts],
+    ast.Tuple: lambda node, context: tuple(_eval_node(item, context) for item in node.elts),
+    ast.Set: lambda node, context: {_eval_node(item, context) for item in node.elts},
+}
+
+
+def _is_interpretable(tree: ast.expr) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.expr) and type(node) not in _NODE_EVALUATORS:
+            return False
+        if isinstance(node, ast.cmpop) and type(node) not in _COMPARE_OPS:
+            return False
+        if isinstance(node, ast.unaryop) and type(node) not in _UNARY_OPS:
+            return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def _parse_rendered_condition(rendered_condition: str) -> Optional[ast.expr]:
+    """Parse a rendered Jinja condition, None when it needs eval(). Rendered conditions repeat, so parses are cached."""
+    tree = ast.parse(rendered_condition.strip(), mode="eval").body
+    return tree if _is_interpretable(tree) else None
+
 
 class WorkflowExecutor:
     """
@@ -27,8 +229,61 @@ class WorkflowExecutor:
         """
         Initialize the workflow executor.
         """
-        self.current_workflow_id: Optional[str] = None
-        self.graph: Optional[StateGraph] = None
+        # Compiled graphs are returned to the caller, the executor is shared by concurrent requests
+        self._graph_cache: TTLCache[_CachedDefinition] = TTLCache(_GRAPH_CACHE_SIZE)
+
+        # Long-lived MCP session shared by every SYSTEM_ACTION step, owned by a background task
+        self._mcp_session = SessionOwner(self._open_mcp_session)
+
+    @staticmethod
+    async def _open_mcp_session(exit_stack: AsyncExitStack) -> ClientSession:
+        read, write, _ = await exit_stack.enter_async_context(streamablehttp_client(SETTINGS.cubeassist_mcp_server_url))
+        mcp_session = await exit_stack.enter_async_context(ClientSession(read, write))
+        logger.info("Initializing MCP session")
+        await mcp_session.initialize()
+        return mcp_session
+
+    async def get_mcp_session(self) -> ClientSession:
+        """
+        Return the shared MCP session, opening it on first use or after the previous one failed.
+
+        Returns:
+            Initialized MCP client session
+        """
+        return await self._mcp_session.get()
+
+    async def close(self) -> None:
+        """
+        Close the shared MCP session.
+        """
+        await self._mcp_session.close()
+
+    async def call_mcp_tool(self, tool_name: str, tool_params: Optional[Dict[str, Any]]) -> Any:
+        """
+        Call a tool on the shared MCP session.
+
+        A call failing on a stale session (the transport broke) is retried once on a fresh session, errors
+        the MCP server answered with are raised as they are.
+
+        Args:
+            tool_name: Name of the MCP tool
+            tool_params: Tool arguments
+
+        Returns:
+            Tool call result
+        """
+        for attempt in range(2):
+            mcp_session = await self.get_mcp_session()
+            try:
+                return await mcp_session.call_tool(tool_name, tool_params)
+            except McpError:
+                raise
+            except Exception as e:
+                if attempt:
+                    raise
+                logger.warning(f"MCP call to {tool_name} failed on the shared session, reconnecting: {e}")
+                # Only this session is closed, requests that already reconnected keep the new one
+                await self._mcp_session.close(mcp_session)
 
     def build_graph(self, workflow_state: WorkflowState):
         """
@@ -53,6 +308,22 @@ class WorkflowExecutor:
             logger.warning("No steps found in workflow state")
             return None
         
+        # Handlers only bind step definitions, so a graph compiled for the same definition and start step is
+        # reusable. The workflow service cache hands out the same steps list until the definition is reloaded,
+        # its identity stands for the definition version (the entry keeps the list alive so the id is not reused)
+        cache_key = (workflow_state.workflow_id, id(steps))
+        cached = self._graph_cache.get(cache_key)
+        if cached is not None and cached.steps is steps:
+            cached_graph = cached.graphs.get(start_step_id)
+            if cached_graph is not None:
+                logger.info(f"Reusing compiled graph for workflow: {workflow_state.workflow_id}, start step: {start_step_id}")
+                return cached_graph
+        else:
+            # Compiled artefacts are kept here rather than on the step definitions, which the workflow service shares
+            cached = _CachedDefinition(steps, {step.get("step_id"): self._compile_step(step) for step in steps}, {})
+            self._graph_cache.put(cache_key, cached)
+        compiled_steps = cached.compiled_steps
+
         logger.info(f"Building graph with steps: {step_ids}")
         logger.info(f"Start step: {start_step_id}")
         
@@ -67,15 +338,21 @@ class WorkflowExecutor:
             step_ids_used_for_edges = step_ids
             logger.warning(f"start_step_id '{start_step_id}' not found in step_ids, using all steps")
         
-        # Create mapping of step_id to step details
-        step_details = {step.get("step_id"): step for step in steps}
+        # Mapping of step_id to step details, prebuilt by the workflow manager
+        step_details = workflow_state.step_by_id or {step.get("step_id"): step for step in steps}
         
-        # Create a mapping of step_id to next_step_id
-        step_to_next = {}
-        for step in steps:
-            step_id = step.get("step_id")
-            next_step = step.get("next_step_id")
-            step_to_next[step_id] = next_step
+        # Mapping of step_id to next_step_id, copied since parallel groups rewrite entries below
+        if workflow_state.next_step_by_id:
+            step_to_next = dict(workflow_state.next_step_by_id)
+        else:
+            step_to_next = {step.get("step_id"): step.get("next_step_id") for step in steps}
+        
+        # Consecutive SYSTEM_ACTION steps sharing a parallel_group_id run concurrently in the node of
+        # the first step of the group, which then continues at the step after the last one
+        parallel_groups = self._collect_parallel_groups(step_details)
+        for first_step_id, group_steps in parallel_groups.items():
+            step_to_next[first_step_id] = group_steps[-1].get("next_step_id")
+            logger.info(f"Parallel step group from {first_step_id}: {[step.get('step_id') for step in group_steps]}")
         
         # Add nodes for each step based on their actual type (use all step_ids for nodes)
         for step_id in step_ids:
@@ -86,20 +363,18 @@ class WorkflowExecutor:
                 
             step_type = step_detail.get("type")
             
-            # Map step types to handler methods with step info
-            if step_type == "USER_INPUT":
-                handler = partial(self.user_input_with_step, step_detail)
-                graph.add_node(step_id, handler)
-            elif step_type == "FINAL_RESPONSE":
-                handler = partial(self.final_response_with_step, step_detail)
-                graph.add_node(step_id, handler)
-            elif step_type == "SYSTEM_ACTION":
-                handler = partial(self.system_control_with_step, step_detail)
-                graph.add_node(step_id, handler)
+            # Map step types to handler methods with step info and its compiled artefacts
+            if step_id in parallel_groups:
+                group_steps = parallel_groups[step_id]
+                handler = partial(self.parallel_system_control_with_steps, group_steps,
+                                  compiled=[compiled_steps.get(step.get("step_id")) for step in group_steps])
             else:
-                logger.warning(f"Unknown step type '{step_type}' for step '{step_id}', defaulting to SYSTEM_ACTION")
-                handler = partial(self.system_control_with_step, step_detail)
-                graph.add_node(step_id, handler)
+                handler_fn = self._HANDLERS.get(step_type)
+                if handler_fn is None:
+                    logger.warning(f"Unknown step type '{step_type}' for step '{step_id}', defaulting to SYSTEM_ACTION")
+                    handler_fn = WorkflowExecutor.system_control_with_step
+                handler = partial(handler_fn, self, step_detail, compiled=compiled_steps.get(step_id))
+            graph.add_node(step_id, handler)
         
         # Add edges between steps with conditional logic (use step_ids_used_for_edges)
         if start_step_id:
@@ -107,64 +382,17 @@ class WorkflowExecutor:
             graph.add_edge(START, start_step_id)
             
             # Connect steps to each other with conditional routing - only for steps from start_step_id onwards
+            valid_next = frozenset(step_ids_used_for_edges)
+            
+            # Every step can route to END or, through orchestration rules, to any step, so all
+            # conditional edges share one target mapping (the configured next step is always a step)
+            possible_targets = {END: END, **{step_id_target: step_id_target for step_id_target in step_ids}}
+            
             for step_id in step_ids_used_for_edges:
                 next_step = step_to_next.get(step_id)
                 
                 # Add conditional edge that checks workflow state status
-                def should_continue(state: WorkflowState, current_step_id=step_id, next_step_id=next_step):
-                    """
-                    Determine the next step based on workflow state status.
-                    
-                    Args:
-                        state: Current workflow state
-                        current_step_id: ID of the current step
-                        next_step_id: ID of the configured next step
-                        
-                    Returns:
-                        Next step ID or END
-                    """
-                    logger.info(f"Step {current_step_id} completed with status: {state.task_state}")
-
-                    logger.info(f"Here is the Go to Step Id: {state.go_to_step_id}")
-                    
-                    # Check if orchestration rule set a go_to_step_id
-                    if hasattr(state, 'go_to_step_id') and state.go_to_step_id:
-                        target_step_id = state.go_to_step_id
-                        state.go_to_step_id=None
-                        logger.info(f"Orchestration rule routing from {current_step_id} to {target_step_id}")
-                        return target_step_id
-                    
-                    # Get status value
-                    if hasattr(state.task_state, 'value'):
-                        status_value = state.task_state.value
-                    else:
-                        status_value = str(state.task_state)
-                    
-                    # If status is input_required, go to END to pause workflow
-                    if status_value == TaskState.input_required.value:
-                        logger.info(f"Step {current_step_id} requires input, routing to END")
-                        return END
-                    elif status_value == TaskState.failed.value or status_value == TaskState.canceled.value:
-                        logger.info(f"Step {current_step_id} {status_value}, routing to END")
-                        return END
-                    elif next_step_id and next_step_id in step_ids_used_for_edges:
-                        logger.info(f"Step {current_step_id} completed, routing to next step: {next_step_id}")
-                        return next_step_id
-                    else:
-                        # No next step or workflow completed
-                        logger.info(f"Step {current_step_id} is final step, routing to END")
-                        return END
-                
-                # Create the conditional mapping - include all possible step targets
-                possible_targets = {END: END}  # Always include END
-                
-                # Add the normal next step if it exists
-                if next_step and next_step in step_ids_used_for_edges:
-                    possible_targets[next_step] = next_step
-                
-                # Add ALL step IDs as possible targets for orchestration rules
-                for step_id_target in step_ids:
-                    possible_targets[step_id_target] = step_id_target
+                should_continue = partial(self._should_continue, current_step_id=step_id, next_step_id=next_step, valid_next=valid_next)
                 
                 graph.add_conditional_edges(
                     step_id,
@@ -172,40 +400,238 @@ class WorkflowExecutor:
                     possible_targets
                 )
         
-        # Compile and store the graph
+        # Compile and cache the graph
         compiled_graph = graph.compile()
+        cached.graphs[start_step_id] = compiled_graph
         
-        # Store current workflow info
-        self.current_workflow_id = workflow_state.workflow_state.get("workflow_id")
-        self.graph = compiled_graph
-        
-        logger.info(f"Graph compiled successfully for workflow: {self.current_workflow_id}")
+        logger.info(f"Graph compiled successfully for workflow: {workflow_state.workflow_id}")
         logger.info(f"Graph contains {len(step_ids)} nodes: {step_ids}")
         
         return compiled_graph
 
-    async def execute(self, workflow_state: WorkflowState) -> WorkflowState:
+    def _should_continue(self, state: WorkflowState, current_step_id: str, next_step_id: Optional[str], valid_next: frozenset) -> str:
+        """
+        Determine the next step based on workflow state status.
+        
+        Args:
+            state: Current workflow state
+            current_step_id: ID of the current step
+            next_step_id: ID of the configured next step
+            valid_next: Step IDs that can be routed to as the next step
+            
+        Returns:
+            Next step ID or END
+        """
+        logger.info(f"Step {current_step_id} completed with status: {state.task_state}")
+
+        logger.info(f"Here is the Go to Step Id: {state.go_to_step_id}")
+        
+        # Check if orchestration rule set a go_to_step_id
+        if hasattr(state, 'go_to_step_id') and state.go_to_step_id:
+            target_step_id = state.go_to_step_id
+            state.go_to_step_id=None
+            logger.info(f"Orchestration rule routing from {current_step_id} to {target_step_id}")
+            return target_step_id
+        
+        # Handlers store the enum value, the enum itself is accepted too
+        status_value = getattr(state.task_state, "value", state.task_state)
+        
+        # If status is input_required, go to END to pause workflow
+        if status_value == _INPUT_REQUIRED:
+            logger.info(f"Step {current_step_id} requires input, routing to END")
+            return END
+        elif status_value in _STOPPED_STATES:
+            logger.info(f"Step {current_step_id} {status_value}, routing to END")
+            return END
+        elif next_step_id and next_step_id in valid_next:
+            logger.info(f"Step {current_step_id} completed, routing to next step: {next_step_id}")
+            return next_step_id
+        else:
+            # No next step or workflow completed
+            logger.info(f"Step {current_step_id} is final step, routing to END")
+            return END
+
+    def _collect_parallel_groups(self, step_details: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Find the chains of SYSTEM_ACTION steps linked by next_step_id that share a parallel_group_id.
+
+        Args:
+            step_details: Mapping of step_id to step details
+
+        Returns:
+            Mapping of the first step_id of each group to the group steps in chain order
+        """
+        def group_of(step_detail: Optional[Dict[str, Any]]) -> Optional[str]:
+            if step_detail and step_detail.get("type") == "SYSTEM_ACTION":
+                return step_detail.get("parallel_group_id")
+            return None
+
+        # A group starts at a step no other step of the same group points to
+        targeted = {
+            step.get("next_step_id") for step in step_details.values()
+            if group_of(step) and group_of(step) == group_of(step_details.get(step.get("next_step_id")))
+        }
+
+        parallel_groups = {}
+        for step_id, step_detail in step_details.items():
+            group_id = group_of(step_detail)
+            if not group_id or step_id in targeted:
+                continue
+            group_steps = [step_detail]
+            seen = {step_id}
+            next_step_id = step_detail.get("next_step_id")
+            while next_step_id not in seen and group_of(step_details.get(next_step_id)) == group_id:
+                seen.add(next_step_id)
+                group_steps.append(step_details[next_step_id])
+                next_step_id = step_details[next_step_id].get("next_step_id")
+            if len(group_steps) > 1:
+                parallel_groups[step_id] = group_steps
+        return parallel_groups
+
+    def _compile_step(self, step_detail: Dict[str, Any]) -> CompiledStep:
+        """
+        Compile the user message template, orchestration rule conditions and mappings of a step.
+
+        Args:
+            step_detail: Step information, not modified
+
+        Returns:
+            Compiled step artefacts
+        """
+        return CompiledStep(
+            self._compile_user_message(step_detail),
+            self._compile_orchestration_rules(step_detail),
+            self._compile_mappings(step_detail),
+        )
+
+    def _compile_mappings(self, step_detail: Dict[str, Any]) -> Tuple[Tuple[str, Any, Any, bool], ...]:
+        """
+        Merge a system action's success and output mappings into one list of (key, json_path, parsed path,
+        escape) entries. Success mappings come first so output mappings win on the same key.
+
+        Args:
+            step_detail: Step information
+
+        Returns:
+            Mapping entries, empty for steps without a system action
+        """
+        system_action = step_detail.get("system_action_details")
+        if not system_action:
+            return ()
+        all_mappings = []
+        # Output mapped strings are escaped because templates render them into JSON
+        for mapping_name, escape in (("success_mapping", False), ("output_mapping", True)):
+            mapping = system_action.get(mapping_name)
+            if not isinstance(mapping, dict):
+                continue
+            for key, json_path in mapping.items():
+                compiled_path = None
+                if isinstance(json_path, str) and json_path:
+                    try:
+                        compiled_path = Utilities.compile_json_path(json_path)
+                    except Exception as e:
+                        # Left unparsed so extraction logs the failure when the step runs
+                        logger.warning(f"Invalid JSON path '{json_path}' in {mapping_name} of step '{step_detail.get('step_id')}': {e}")
+                all_mappings.append((key, json_path, compiled_path, escape))
+        return tuple(all_mappings)
+
+    def _compile_user_message(self, step_detail: Dict[str, Any]) -> Any:
+        """
+        Precompile the user message template of a step.
+
+        Args:
+            step_detail: Step information
+
+        Returns:
+            Compiled template, None if the step has no user message or it does not compile
+        """
+        user_message = (step_detail.get("user_interaction") or {}).get("user_message")
+        if not user_message:
+            return None
+        try:
+            return _JINJA_ENV.from_string(user_message)
+        except TemplateSyntaxError as e:
+            # The step compiles it again when it runs and fails with this error
+            logger.warning(f"User message template of step '{step_detail.get('step_id')}' is invalid: {e}")
+            return None
+
+    def _compile_orchestration_rules(self, step_detail: Dict[str, Any]) -> Tuple[Optional[CompiledRule], ...]:
+        """
+        Precompile the orchestration rule conditions of a step.
+
+        Pure-Python conditions get the parsed expression (for the restricted interpreter), the compiled
+        code object (eval() fallback) and the variable names it reads, conditions written as Jinja
+        templates get their compiled template and keep the render-then-evaluate path.
+
+        Args:
+            step_detail: Step information
+
+        Returns:
+            Compiled conditions, index-aligned with the step's orchestration rules
+        """
+        user_interaction = step_detail.get("user_interaction") or {}
+        compiled_rules = []
+        for rule in user_interaction.get("orchestration_rules") or []:
+            condition = rule.get("condition") if isinstance(rule, dict) else None
+            compiled_rule = None
+            if not isinstance(condition, str):
+                pass
+            elif _is_jinja_condition(condition):
+                try:
+                    variables = frozenset(meta.find_undeclared_variables(_JINJA_ENV.parse(condition)))
+                    compiled_rule = CompiledRule(_JINJA_ENV.from_string(condition), variables, None, None)
+                except TemplateSyntaxError as e:
+                    logger.warning(f"Orchestration rule condition '{condition}' is not a valid template: {e}")
+            else:
+                try:
+                    tree = ast.parse(condition, mode="eval")
+                    collector = _NameCollector()
+                    collector.visit(tree)
+                    condition_ast = tree.body if _is_interpretable(tree.body) else None
+                    if condition_ast is None:
+                        logger.warning(f"Orchestration rule condition '{condition}' uses unsupported expressions, evaluating it with eval()")
+                    compiled_rule = CompiledRule(None, frozenset(collector.names), compile(condition, "<rule>", "eval"), condition_ast)
+                except SyntaxError as e:
+                    # Surfaced as an invalid rule when the step runs
+                    logger.warning(f"Orchestration rule condition '{condition}' is not a valid expression: {e}")
+            compiled_rules.append(compiled_rule)
+        return tuple(compiled_rules)
+
+    async def execute(self, graph: CompiledStateGraph, workflow_state: WorkflowState, on_event: Optional[StepEventCallback] = None) -> WorkflowState:
         """
         Execute a workflow using the workflow state.
         
         Args:
+            graph: Compiled graph returned by build_graph for this workflow state
             workflow_state: WorkflowState containing workflow definition, steps, and execution context
+            on_event: Optional coroutine called with (step_id, step_update) as soon as each step completes
             
         Returns:
             Updated workflow state after execution
         """
-        workflow_state=await self.graph.ainvoke(workflow_state)
+        if on_event is None:
+            workflow_state=await graph.ainvoke(workflow_state)
+            return workflow_state
+
+        async for stream_mode, chunk in graph.astream(workflow_state, stream_mode=["updates", "values"]):
+            if stream_mode == "values":
+                workflow_state = chunk
+            else:
+                for step_id, step_update in chunk.items():
+                    # Only the outcome is reported, the rest of the workflow state stays server side
+                    await on_event(step_id, {"task_state": step_update.get("task_state"), "output": step_update.get("output")})
         return workflow_state
 
     @timed("User Input Step")
     @process_workflow_run()
-    async def user_input_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState) -> WorkflowState:
+    async def user_input_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState, compiled: Optional[CompiledStep] = None) -> WorkflowState:
         """
         Handle user input step with step details.
         
         Args:
             step_detail: Current step information
             workflow_state: Current workflow state
+            compiled: Step artefacts compiled by build_graph, compiled on the fly if not given
             
         Returns:
             Updated workflow state with user input processing
@@ -213,15 +639,18 @@ class WorkflowExecutor:
     
         step_id = step_detail.get("step_id")
         logger.info(f"Processing user input step: {step_id}")
+        if compiled is None:
+            compiled = self._compile_step(step_detail)
         user_interaction=step_detail.get("user_interaction",{})
         workflow_id=workflow_state.workflow_id
         workflow_name=workflow_state.workflow_name
-        workflow_exit_keywords=workflow_state.worflow_exit_keywords
         
         workflow_input_text = workflow_state.input
         workflow_input_data = workflow_state.input_data
+        # Case-folded once for the exit keyword and decline checks
+        input_folded = workflow_input_text.casefold() if workflow_input_text else ""
 
-        if workflow_input_text and workflow_input_text.lower() in [keyword.lower() for keyword in workflow_exit_keywords]:
+        if input_folded and input_folded in workflow_state.exit_keywords_lower:
             logger.info(f"Workflow exit keyword '{workflow_input_text}' received, terminating workflow.")
             workflow_state.task_state = TaskState.canceled.value
             workflow_state.output = {"summary": f"Workflow {workflow_id} ({workflow_name}) terminated."}
@@ -239,7 +668,7 @@ class WorkflowExecutor:
                 expected_data_key = expected_data_keys[0] if expected_data_keys else None
                 workflow_state.workflow_state[expected_data_key] = workflow_input_text
 
-                if expected_data_key == "confirm_action" and workflow_input_text.lower() in ['no', 'n']:
+                if expected_data_key == "confirm_action" and input_folded in _DECLINE_ANSWERS:
                     logger.info(f"User declined confirmation, exiting workflow")
                     workflow_state.task_state = TaskState.canceled.value
                     workflow_state.output = {"summary": "Action cancelled by user"}
@@ -247,43 +676,64 @@ class WorkflowExecutor:
             
             orchestration_rules = user_interaction.get("orchestration_rules", None)
             if orchestration_rules:
-                for rule in orchestration_rules:
+                for rule, compiled_rule in zip(orchestration_rules, compiled.rules):
                     try:
                         # Handle new format with Jinja2 conditions
                         if "condition" in rule and "go_to_step" in rule:
                             condition_template = rule.get("condition")
                             target_step_id = rule.get("go_to_step")
+
+                            compiled_condition = compiled_rule.code if compiled_rule is not None else None
+                            if compiled_condition is not None:
+                                # Pure-Python condition, evaluate the precompiled expression against the state
+                                template_variables = compiled_rule.variables
+                                # Read-only view, the state is not copied and conditions cannot assign into it
+                                context = MappingProxyType(workflow_state.workflow_state)
+                                missing_vars = [var for var in template_variables if var not in context]
+                                if missing_vars:
+                                    logger.warning(f"Orchestration rule condition '{condition_template}' references undefined variables: {missing_vars}. Skipping rule.")
+                                    continue
+                                try:
+                                    condition_ast = compiled_rule.tree
+                                    if condition_ast is not None:
+                                        condition_result = _eval_node(condition_ast, context)
+                                    else:
+                                        condition_result = eval(compiled_condition, _SAFE_EVAL_GLOBALS, context)
+                                except Exception as eval_error:
+                                    logger.error(f"Error evaluating condition '{condition_template}': {eval_error}")
+                                    raise ValueError(f"Failed to evaluate orchestration rule condition '{condition_template}': {eval_error}")
+                                if condition_result:
+                                    logger.info(f"Orchestration rule matched: {condition_template}, routing to step {target_step_id}")
+                                    workflow_state.go_to_step_id = target_step_id
+                                    break  # Exit after first match
+                                continue
                            
-                            # Get all undeclared variables from template
-                            template_env = Environment()
-                            parsed_content = template_env.parse(condition_template)
-                            template_variables = meta.find_undeclared_variables(parsed_content)
+                            # Variables are reset after the rules ran, the missing ones are collected while rendering
+                            template = compiled_rule.template if compiled_rule is not None else None
+                            if template is not None:
+                                template_variables = compiled_rule.variables
+                            else:
+                                template = _JINJA_ENV.from_string(condition_template)
+                                template_variables = meta.find_undeclared_variables(_JINJA_ENV.parse(condition_template))
                             
                             logger.info(f"Template variables found: {template_variables}")
                             
-                            # Create context with workflow state (direct field access)
-                            context = workflow_state.workflow_state.copy()
-                           
-                            # Check if all required variables are available
-                            missing_vars = []
-                            for var in template_variables:
-                                if var not in context:
-                                    missing_vars.append(var)
-                                                             
-                            if missing_vars:
-                                logger.warning(f"Orchestration rule condition '{condition_template}' references undefined variables: {missing_vars}. Skipping rule.")
-                                continue
-                            
-                            # Use Jinja2 to evaluate the condition
-                            template = template_env.from_string(condition_template)
-                            
                             try:
                                 # Render the condition and evaluate as boolean
-                                rendered_condition = template.render(context)
+                                rendered_condition, missing_vars = _render_condition(template, workflow_state.workflow_state)
+                                if missing_vars:
+                                    logger.warning(f"Orchestration rule condition '{condition_template}' references undefined variables: {sorted(missing_vars)}. Skipping rule.")
+                                    continue
                                 logger.info(f"Rendered condition: {rendered_condition}")
                                 
                                 # Simple evaluation - check if condition evaluates to True
-                                condition_result = eval(rendered_condition)
+                                condition_ast = _parse_rendered_condition(rendered_condition)
+                                if condition_ast is not None:
+                                    condition_result = _eval_node(condition_ast, {})
+                                else:
+                                    logger.warning(f"Rendered condition '{rendered_condition}' uses unsupported expressions, evaluating it with eval()")
+                                    # Same sandbox as the pure-Python conditions, no builtins and nothing else in scope
+                                    condition_result = eval(rendered_condition, _SAFE_EVAL_GLOBALS, {})
                                 
                                 if condition_result:
                                     logger.info(f"Orchestration rule matched: {condition_template}, routing to step {target_step_id}")
@@ -311,14 +761,9 @@ class WorkflowExecutor:
             
             user_message = step_detail.get("user_interaction",{}).get("user_message", None)
             
-            template_env = Environment()
-            template = template_env.from_string(user_message)
+            template = compiled.user_message_template or _JINJA_ENV.from_string(user_message)
             rendered_template = template.render(workflow_state.workflow_state)
-            output={}
-            try:
-                output = json.loads(rendered_template)
-            except json.JSONDecodeError:
-                output["summary"] = rendered_template
+            output = _parse_rendered_output(rendered_template)
             
             workflow_state.output = output
             workflow_state.task_state = TaskState.input_required.value
@@ -332,18 +777,19 @@ class WorkflowExecutor:
         else:
             tool_input["token"] = state.token
             result = await self.session.call_tool(state.selected_tool, tool_input)
-        result_dict = json.loads(result.content[0].text)
+        result_dict = orjson.loads(result.content[0].text)
         return result_dict
 
     @timed("System Control Step")
     @process_workflow_run()
-    async def system_control_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState) -> WorkflowState:
+    async def system_control_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState, compiled: Optional[CompiledStep] = None) -> WorkflowState:
         """
         Handle system control/action step with step details.
         
         Args:
             step_detail: Current step information
             workflow_state: Current workflow state
+            compiled: Step artefacts compiled by build_graph, compiled on the fly if not given
             
         Returns:
             Updated workflow state with system action results
@@ -360,15 +806,13 @@ class WorkflowExecutor:
         error_mapping = system_action.get("error_mapping", {})
         output_mapping = system_action.get("output_mapping")
 
-        tool_params = json.loads(tool_input) if isinstance(tool_input, str) else tool_input
+        tool_params = orjson.loads(tool_input) if isinstance(tool_input, str) else tool_input
         
         if tool_params:
             logger.info(f"Original tool_params: {tool_params}")
-            workflow_state.workflow_state["token"]=workflow_state.token
-            workflow_state.workflow_state["user_id"] = workflow_state.user_id
-            tool_params = Utilities.resolve_jsonpath_in_params(tool_params, workflow_state.workflow_state)
-            del workflow_state.workflow_state["token"]
-            del workflow_state.workflow_state["user_id"]
+            # Token and user id are visible to the resolver only, the workflow state itself is never mutated
+            resolve_data = {**workflow_state.workflow_state, "token": workflow_state.token, "user_id": workflow_state.user_id}
+            tool_params = Utilities.resolve_jsonpath_in_params(tool_params, resolve_data)
             logger.info(f"Resolved tool_params: {tool_params}")
         
         result = {}
@@ -376,16 +820,12 @@ class WorkflowExecutor:
         
         try:
             async with asyncio.timeout(45):
-                async with streamablehttp_client(SETTINGS.cubeassist_mcp_server_url) as (read, write, _):
-                    async with ClientSession(read, write) as mcp_session:
-                        logger.info(f"Initializing MCP session for tool: {tool_name}")
-                        await mcp_session.initialize()
-                        logger.info(f"MCP session initialized, calling tool: {tool_name} with params: {tool_params}")
-                        result = await mcp_session.call_tool(tool_name, tool_params)
-                        tool_output = result.content[0].text
-                        if isinstance(tool_output, str):
-                            tool_output = json.loads(tool_output)
-                        logger.info(f"Tool {tool_name} executed successfully")
+                logger.info(f"Calling tool: {tool_name} with params: {tool_params}")
+                result = await self.call_mcp_tool(tool_name, tool_params)
+            tool_output = result.content[0].text
+            if isinstance(tool_output, str):
+                tool_output = orjson.loads(tool_output)
+            logger.info(f"Tool {tool_name} executed successfully")
 
             # Check for error in tool output
             error_mapping = Utilities.resolve_jsonpath_in_params(error_mapping, tool_output)
@@ -406,49 +846,92 @@ class WorkflowExecutor:
             workflow_state.output = {"summary": f"{str(e)}"}
             return workflow_state
         
-        # Process success mapping
-        success_mapping = system_action.get("success_mapping", {})
-        if success_mapping and isinstance(success_mapping, dict):
-            for key, json_path in success_mapping.items():
-                workflow_state.inputs[key] = Utilities.extract_json_path_value(tool_output, json_path)
-        
-        # Process output_key mappings to extract values from tool_output
+        # Process success and output mappings in one pass to extract values from tool_output
+        all_mappings = compiled.mappings if compiled is not None else self._compile_mappings(step_detail)
         if output_mapping and isinstance(output_mapping, dict):
             logger.info(f"Processing output mappings: {output_mapping}")
+        for key, json_path, compiled_path, escape in all_mappings:
+            # Extract value using the JSON path parsed at graph build time
+            extracted_value = Utilities.extract_json_path_value(tool_output, json_path, compiled_path)
             
-            for key, json_path in output_mapping.items():
-                # Extract value using JSON path
-                extracted_value = Utilities.extract_json_path_value(tool_output, json_path)
-                
-                # If the extracted value is a string, properly escape it for JSON
-                if isinstance(extracted_value, str):
-                    try:
-                        # Use json.dumps to properly escape, then remove outer quotes
-                        escaped_value = json.dumps(extracted_value)
-                        # Remove the outer quotes that json.dumps adds
-                        extracted_value = escaped_value[1:-1] if len(escaped_value) > 1 else extracted_value
-                    except Exception as escape_error:
-                        logger.warning(f"Could not escape value for key '{key}': {escape_error}")
-                        # Fallback: basic manual escaping
-                        extracted_value = extracted_value.replace('\n', '\\n').replace('"', '\\"')
-                
-                # Update workflow state inputs with the extracted value
-                workflow_state.workflow_state[key] = extracted_value
-                
-                logger.info(f"Mapped '{key}' = {extracted_value} from path '{json_path}'")
+            # If the extracted value is a string, properly escape it for JSON
+            if escape and isinstance(extracted_value, str):
+                extracted_value = extracted_value.translate(_JSON_STR_ESCAPE)
+            
+            # Update workflow state inputs with the extracted value
+            workflow_state.workflow_state[key] = extracted_value
+            
+            logger.info(f"Mapped '{key}' = {extracted_value} from path '{json_path}'")
+
+        workflow_state.task_state = TaskState.completed.value
+        return workflow_state
+
+    @timed("Parallel System Control Step")
+    async def parallel_system_control_with_steps(self, step_details: List[Dict[str, Any]], workflow_state: WorkflowState, compiled: Optional[List[Optional[CompiledStep]]] = None) -> WorkflowState:
+        """
+        Run a group of independent system control steps concurrently.
+
+        Every step runs on its own copy of the workflow state, the keys each step set are merged back
+        in step order and the first failed or canceled step decides the outcome of the group. A step
+        raising cancels the others and fails the group.
+        
+        Args:
+            step_details: Steps of the parallel group in chain order
+            workflow_state: Current workflow state
+            compiled: Artefacts of each step compiled by build_graph, in the order of step_details
+            
+        Returns:
+            Updated workflow state with the merged system action results
+        """
+        logger.info(f"Processing parallel system control steps: {[step.get('step_id') for step in step_details]}")
+        base_values = workflow_state.workflow_state
+        initial_values = dict(base_values)
+        branch_states = [
+            replace(
+                workflow_state,
+                workflow_state=dict(initial_values),
+                # Each step is recorded under its own step run
+                current_step_run_id=workflow_state.current_step_run_id if index == 0 else str(uuid.uuid4())
+            )
+            for index in range(len(step_details))
+        ]
+        compiled_steps = compiled or [None] * len(step_details)
+        try:
+            # A step raising cancels the steps still running, no further tool calls are made for a failed group
+            async with asyncio.TaskGroup() as task_group:
+                tasks = [
+                    task_group.create_task(self.system_control_with_step(step_detail, branch_state, compiled=compiled_step))
+                    for step_detail, branch_state, compiled_step in zip(step_details, branch_states, compiled_steps)
+                ]
+        except ExceptionGroup as error_group:
+            error = error_group.exceptions[0]
+            logger.error(f"Parallel system control step failed, remaining steps cancelled: {error}")
+            workflow_state.task_state = TaskState.failed.value
+            workflow_state.output = {"summary": f"{str(error)}"}
+            workflow_state.current_step_run_id = str(uuid.uuid4())
+            return workflow_state
 
         workflow_state.task_state = TaskState.completed.value
+        for result_state in (task.result() for task in tasks):
+            for key, value in result_state.workflow_state.items():
+                if key not in initial_values or initial_values[key] is not value:
+                    base_values[key] = value
+            if workflow_state.task_state == TaskState.completed.value:
+                workflow_state.task_state = result_state.task_state
+                workflow_state.output = result_state.output
+        workflow_state.current_step_run_id = str(uuid.uuid4())
         return workflow_state
 
     @timed("Final Step")
     @process_workflow_run()
-    async def final_response_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState) -> WorkflowState:
+    async def final_response_with_step(self, step_detail: Dict[str, Any], workflow_state: WorkflowState, compiled: Optional[CompiledStep] = None) -> WorkflowState:
         """
         Handle final response step with step details.
         
         Args:
             step_detail: Current step information
             workflow_state: Current workflow state
+            compiled: Step artefacts compiled by build_graph, compiled on the fly if not given
             
         Returns:
             Updated workflow state with final response
@@ -466,17 +949,19 @@ class WorkflowExecutor:
             workflow_state.task_state = TaskState.failed.value
             return workflow_state
         
-        template_env = Environment()
-        template = template_env.from_string(user_message)
+        template = (compiled.user_message_template if compiled is not None else None) or _JINJA_ENV.from_string(user_message)
         rendered_template = template.render(workflow_state.workflow_state)
-        output={}
-        try:
-            output = json.loads(rendered_template)
-        except json.JSONDecodeError:
-            output["summary"] = rendered_template
+        output = _parse_rendered_output(rendered_template)
         
         workflow_state.output = output
         workflow_state.task_state = TaskState.completed.value
         
         logger.info(f"Final response output: {output}")
-        return workflow_state
\ No newline at end of file
+        return workflow_state
+
+    # Step type to handler, handlers take (self, step_detail, workflow_state, compiled=None)
+    _HANDLERS = {
+        "USER_INPUT": user_input_with_step,
+        "FINAL_RESPONSE": final_response_with_step,
+        "SYSTEM_ACTION": system_control_with_step,
+    }
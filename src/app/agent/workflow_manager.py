@@ -1,4 +1,4 @@
-import functools
+import hashlib
 from typing import Optional, List, Dict, Any,Tuple
 from app.utils.agent_message import AgentInputMessage, AgentOutputMessage
 from app.utils.logging import logger
@@ -6,12 +6,19 @@ from a2a.types import TaskState
 import json
 import asyncio
 from typing import Optional, List, Dict, Any,Tuple
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
-from app.agent.wokflow_state import WorkflowState
-from app.agent.workflow_executor import WorkflowExecutor
+from app.agent.workflow_state import WorkflowState
+from app.agent.workflow_executor import StepEventCallback, WorkflowExecutor
+from app.utils.ttl_cache import TTLCache
 from app.utils.workflow_service import WorkflowService
-from app.utils.settings import SETTINGS
+
+_WORKING = TaskState.working.value
+
+# User info is cached briefly per token, keyed by a digest so raw tokens are not kept in memory
+_USER_INFO_CACHE_SIZE = 4096
+_USER_INFO_TTL = 60
+_user_info_cache: TTLCache[Tuple[str, List[str]]] = TTLCache(_USER_INFO_CACHE_SIZE, _USER_INFO_TTL)
+# Lookups in flight per token, concurrent cold misses for the same token share one MCP call
+_user_info_pending: Dict[bytes, asyncio.Task] = {}
 
 
 class WorkflowManager:
@@ -24,27 +31,53 @@ class WorkflowManager:
         self.workflow_service = WorkflowService()
         self.workflow_executor = WorkflowExecutor()
 
-    @staticmethod
-    async def get_user_info(token: str) -> Tuple[str, List[str]]:
-        """Retrieve user ID and roles from token via MCP call."""
+    async def get_user_info(self, token: str) -> Tuple[str, List[str]]:
+        """
+        Retrieve user ID and roles from token, cached for a short time per token.
+        """
+        cache_key = hashlib.sha256((token or "").encode()).digest()
+        user_info = _user_info_cache.get(cache_key)
+        if user_info is not None:
+            return user_info
+
+        pending = _user_info_pending.get(cache_key)
+        if pending is None:
+            pending = asyncio.create_task(self._fetch_user_info(token))
+            _user_info_pending[cache_key] = pending
+            pending.add_done_callback(lambda _: _user_info_pending.pop(cache_key, None))
+        # Shielded so one caller being cancelled does not cancel the lookup for the others
+        user_info = await asyncio.shield(pending)
+
+        _user_info_cache.put(cache_key, user_info)
+        return user_info
+
+    async def _fetch_user_info(self, token: str) -> Tuple[str, List[str]]:
+        """
+        Retrieve user ID and roles from token via MCP call.
+
+        Uses the executor's long-lived MCP session, a call failing on a stale session is retried once on a fresh one.
+        """
         async with asyncio.timeout(100):
-            async with streamablehttp_client(SETTINGS.cubeassist_mcp_server_url) as (read, write, _):
-                async with ClientSession(read, write) as mcp_session:
-                    await mcp_session.initialize()
-                    result = await mcp_session.call_tool(
-                        "get_user_info",
-                        {"token": token}
-                    )
-                    user_info = json.loads(result.content[0].text)
-                    user_id = user_info.get("output", {}).get("data", {}).get("userId")
-                    user_roles = user_info.get("output", {}).get("data", {}).get("roles", [])
-                    return user_id, user_roles
-
-    @functools.lru_cache(maxsize=32)
+            result = await self.workflow_executor.call_mcp_tool(
+                "get_user_info",
+                {"token": token}
+            )
+        user_info = json.loads(result.content[0].text)
+        user_id = user_info.get("output", {}).get("data", {}).get("userId")
+        user_roles = user_info.get("output", {}).get("data", {}).get("roles", [])
+        return user_id, user_roles
+
+    async def close(self) -> None:
+        """
+        Close the MCP session shared with the workflow executor.
+        """
+        await self.workflow_executor.close()
+
     def get_steps_by_workflow_id(self, workflow_id: str, user_roles: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
         """
         Retrieve workflow details along with its steps by workflow_id from database.
         Joins workflows and steps tables, including USER_INPUT and SYSTEM_ACTION step details.
+        Results are cached process-wide by the service layer.
         
         Args:
             workflow_id: Unique workflow identifier (required)
@@ -58,7 +91,6 @@ class WorkflowManager:
         """
         return self.workflow_service.get_steps_by_workflow_id(workflow_id, user_roles)
 
-    @functools.lru_cache(maxsize=16)
     def get_all_workflows(self, user_roles: Tuple[str, ...]) -> List[Dict[str, Any]]:
         """
         Retrieve all workflows accessible by the given user role.
@@ -76,10 +108,10 @@ class WorkflowManager:
 
     async def process_workflow(
         self,
-        agent_input: AgentInputMessage
+        agent_input: AgentInputMessage,
+        on_event: Optional[StepEventCallback] = None
     ) -> AgentOutputMessage:
         try:
-            user_id,user_roles = await WorkflowManager.get_user_info(agent_input.token)
             workflow_run_id=agent_input.task_id
             workflow_id=agent_input.workflow_id
             start_step_id = None
@@ -87,8 +119,11 @@ class WorkflowManager:
             workflow_state_data = {}
             is_new_conversation = True
 
-
-            input_required_data = self.get_input_required_step(workflow_run_id=workflow_run_id)
+            # The user info MCP call and the input-required lookup are independent, run them concurrently
+            (user_id, user_roles), input_required_data = await asyncio.gather(
+                self.get_user_info(agent_input.token),
+                self.get_input_required_step(workflow_run_id=workflow_run_id)
+            )
             if input_required_data:
                 start_step_id = input_required_data["step_id"]
                 workflow_id = input_required_data["workflow_id"]
@@ -104,14 +139,22 @@ class WorkflowManager:
             
             # Extract step information
             steps = workflow.get("steps", [])
-            step_ids = [step.get("step_id") for step in steps]
-            next_step_ids = [step.get("next_step_id") for step in steps if step.get("next_step_id") is not None]
+            step_ids = []
+            next_step_ids = []
+            step_by_id = {}
+            next_step_by_id = {}
+            for step in steps:
+                step_id = step.get("step_id")
+                next_step_id = step.get("next_step_id")
+                step_ids.append(step_id)
+                step_by_id[step_id] = step
+                next_step_by_id[step_id] = next_step_id
+                if next_step_id is not None:
+                    next_step_ids.append(next_step_id)
             
             if start_step_id is None:
-                for step_id in step_ids:
-                    if step_id not in next_step_ids:
-                        start_step_id = step_id
-                        break
+                next_step_id_set = set(next_step_ids)
+                start_step_id = next((step_id for step_id in step_ids if step_id not in next_step_id_set), None)
             
             logger.info(f"Workflow '{workflow['name']}' - Step IDs: {step_ids}")
             logger.info(f"Workflow '{workflow['name']}' - Starting Step: {start_step_id}")
@@ -129,13 +172,15 @@ class WorkflowManager:
                 input=agent_input.input,
                 input_data=agent_input.input_data or {},
                 workflow_state=workflow_state_data,
-                task_state=TaskState.working.value,
+                task_state=_WORKING,
                 output={},
                 current_step_run_id=step_run_id,
                 step_ids=step_ids,
                 next_step_ids=next_step_ids,
                 start_step_id=start_step_id,
                 steps=steps,
+                step_by_id=step_by_id,
+                next_step_by_id=next_step_by_id,
                 is_new_conversation=is_new_conversation,
                 token=agent_input.token,
                 user_id=user_id,
@@ -143,10 +188,10 @@ class WorkflowManager:
             )
 
             # Build graph using workflow executor
-            self.workflow_executor.graph = self.workflow_executor.build_graph(workflow_state)
+            graph = self.workflow_executor.build_graph(workflow_state)
             
             # Execute workflow
-            workflow_state = await self.workflow_executor.execute(workflow_state=workflow_state)
+            workflow_state = await self.workflow_executor.execute(graph=graph, workflow_state=workflow_state, on_event=on_event)
             agent_output = AgentOutputMessage()
             agent_output.output = workflow_state["output"]
             agent_output.task_state = workflow_state["task_state"]
@@ -164,7 +209,7 @@ class WorkflowManager:
             logger.error(f"Workflow execution failed: {e}", exc_info=True)
             raise
 
-    def get_input_required_step(self, workflow_run_id: str) -> Optional[Dict[str, str]]:
+    async def get_input_required_step(self, workflow_run_id: str) -> Optional[Dict[str, str]]:
         """
         Get the workflow_id, step_id, step_run_id, and workflow_state that requires input for the given workflow run.
         Returns data from the latest input-required record.
@@ -179,4 +224,4 @@ class WorkflowManager:
         Raises:
             Exception: If database query fails
         """
-        return self.workflow_service.get_input_required_step(workflow_run_id)
\ No newline at end of file
+        return await self.workflow_service.get_input_required_step(workflow_run_id)
\ No newline at end of file
@@ -1,10 +1,10 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 from a2a.types import Message, TaskState
 from app.agent.state import CubeAssistBaseState
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowState(CubeAssistBaseState):
     """State for workflow execution"""
     workflow_id: str = None
@@ -20,6 +20,15 @@ class WorkflowState(CubeAssistBaseState):
     next_step_ids: List[str] = field(default_factory=list)
     start_step_id: Optional[str] = None
     steps: List[Dict[str, Any]] = field(default_factory=list)
+    # Step definitions and next_step_id keyed by step_id, built once when the workflow is loaded
+    step_by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    next_step_by_id: Dict[str, Optional[str]] = field(default_factory=dict)
     run_id: Optional[str] = None
     user_id: str = None
-    user_roles: Tuple[str, ...] = field(default_factory=tuple)
\ No newline at end of file
+    user_roles: Tuple[str, ...] = field(default_factory=tuple)
+    # Case-folded worflow_exit_keywords, computed once per run for the user input membership check
+    exit_keywords_lower: Optional[FrozenSet[str]] = None
+
+    def __post_init__(self):
+        if self.exit_keywords_lower is None:
+            self.exit_keywords_lower = frozenset(keyword.casefold() for keyword in self.worflow_exit_keywords or ())
\ No newline at end of file
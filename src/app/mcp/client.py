@@ -2,7 +2,7 @@
 import os
 from contextlib import AsyncExitStack
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
@@ -27,6 +27,7 @@ class MCPClient:
             env=env,
         )
         self.exit_stack = AsyncExitStack()
+        self.session: Optional[ClientSession] = None
 
     async def start_session(self):
         stdio_transport = await self.exit_stack.enter_async_context(stdio_client(self.server_params))
@@ -35,8 +36,9 @@ class MCPClient:
         await self.session.initialize()
 
     async def cleanup(self):
-        if self.session:
-            await self.exit_stack.aclose()
+        # Also closes the stdio transport when the session failed to start
+        await self.exit_stack.aclose()
+        self.session = None
 
     async def call_tool(self, tool_name: str, tool_args: dict[str, any]):
         result = await self.session.call_tool(tool_name, tool_args)
@@ -46,15 +48,20 @@ class MCPClient:
         response = await self.session.list_tools()
         return response.tools
 
-    async def mcp_tools_to_openai(self, is_remote: bool, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def mcp_tools_to_openai(self, is_remote: bool, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         openai_tools: List[Dict[str, Any]] = []
+        if not tools:
+            return openai_tools
+        # Tools are either all dicts or all MCP Tool objects, pick the field accessor once
+        field = dict.get if isinstance(tools[0], dict) else lambda tool, key: getattr(tool, key, None)
+        append = openai_tools.append
         for t in tools:
-            name = getattr(t, "name", None) or t.get("name")
-            desc = getattr(t, "description", None) or t.get("description")
-            schema = getattr(t, "inputSchema", None) or t.get("inputSchema")
+            name = field(t, "name")
+            schema = field(t, "inputSchema")
             if not name or not schema:
                 continue
-            openai_tools.append(
+            desc = field(t, "description")
+            append(
                 {
                     "name": name,
                     "type": "function",
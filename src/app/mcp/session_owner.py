@@ -0,0 +1,87 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from app.utils.logging import logger
+
+SessionT = TypeVar("SessionT")
+
+
+class SessionOwner(Generic[SessionT]):
+    """
+    Keeps one long-lived session open in a background task and hands it out to any request task.
+
+    Transports such as the MCP streamable HTTP and stdio clients must be entered and exited by the same
+    task, so the session is opened, kept open and closed by the owner task only. A session that failed
+    is replaced on the next get().
+    """
+
+    def __init__(self, open_session: Callable[[AsyncExitStack], Awaitable[SessionT]]):
+        """
+        Initialize the session owner.
+
+        Args:
+            open_session: Coroutine function entering the transport and session on the given exit stack
+                and returning the initialized session
+        """
+        self._open_session = open_session
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._ready: Optional[asyncio.Future] = None
+        self._closed: Optional[asyncio.Event] = None
+
+    async def _run(self, ready: asyncio.Future, closed: asyncio.Event) -> None:
+        try:
+            async with AsyncExitStack() as exit_stack:
+                ready.set_result(await self._open_session(exit_stack))
+                await closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"Session closed: {e}")
+
+    async def get(self) -> SessionT:
+        """
+        Return the open session, opening it on first use or after the previous one failed.
+
+        Returns:
+            Initialized session
+        """
+        async with self._lock:
+            if self._task is None or self._task.done():
+                self._ready = asyncio.get_running_loop().create_future()
+                self._closed = asyncio.Event()
+                self._task = asyncio.create_task(self._run(self._ready, self._closed))
+            ready = self._ready
+        # Shielded so a caller timing out does not cancel the session setup for everyone else
+        return await asyncio.shield(ready)
+
+    async def close(self, session: Optional[SessionT] = None) -> None:
+        """
+        Close the session and wait for its transport to shut down.
+
+        Args:
+            session: Session the caller found stale, it is only closed while it is still the current one so a
+                session another caller already reopened is kept
+        """
+        async with self._lock:
+            if self._task is None:
+                return
+            if session is not None and self._current() is not session:
+                return
+            task, self._task = self._task, None
+            self._closed.set()
+        try:
+            await task
+        except (Exception, asyncio.CancelledError) as e:
+            # The transport failing or being cancelled on exit only matters if this caller is being cancelled
+            if asyncio.current_task().cancelling():
+                raise
+            logger.warning(f"Session did not close cleanly: {e!r}")
+
+    def _current(self) -> Optional[SessionT]:
+        ready = self._ready
+        if ready is None or not ready.done() or ready.cancelled() or ready.exception() is not None:
+            return None
+        return ready.result()
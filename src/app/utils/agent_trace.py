@@ -1,7 +1,141 @@
+import asyncio
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Tuple
 
 from app.agent.state import AgentState
-from app.utils.postgress import Postgress
-from app.utils.utilities import Utilities
+from app.utils.logging import logger
+from app.utils.postgress import Postgress, json_param
+
+_TRACE_SCHEMA = "supplychain_assist"
+# Batches of at least this many rows are loaded with COPY instead of executemany
+_COPY_THRESHOLD = 1024
+# Queued by close() to stop the background task once the rows ahead of it are written
+_STOP = object()
+
+
+class TraceTable(NamedTuple):
+    schema_name: str
+    table_name: str
+    columns: Tuple[str, ...]
+    insert_sql: str
+
+
+def _trace_table(table_name: str, columns: Tuple[str, ...], placeholders: str) -> TraceTable:
+    return TraceTable(_TRACE_SCHEMA, table_name, columns,
+                      f"INSERT INTO {_TRACE_SCHEMA}.{table_name} ({', '.join(columns)}) VALUES ({placeholders})")
+
+
+_INTERACTION_TRACE = _trace_table(
+    "agent_interaction_trace",
+    ("context_id", "task_id", "source_agent_name", "target_agent_name", "input_payload", "output_payload", "status", "execution_duration", "execution_time"),
+    "$1, $2, $3, $4, $5, $6, $7, $8, $9"
+)
+
+_MCP_INTERACTION_TRACE = _trace_table(
+    "agent_mcp_interaction_trace",
+    ("context_id", "task_id", "agent_name", "tool_name", "input_payload", "output_payload", "status", "execution_duration", "execution_time"),
+    "$1, $2, $3, $4, $5::jsonb, $6::jsonb, $7, $8, $9"
+)
+
+
+class TraceWriter:
+    """
+    Buffers trace rows in an asyncio.Queue and writes them from a background task.
+    Rows collected within max_delay are written per table with one executemany, or with COPY for large batches,
+    callers never wait on the database.
+    """
+
+    def __init__(self, max_batch_size: int = 4096, max_delay: float = 0.1, max_queue_size: int = 10000):
+        """
+        Initialize the trace writer.
+
+        Args:
+            max_batch_size: Maximum number of rows written per flush
+            max_delay: Seconds after the first queued row before the batch is written
+            max_queue_size: Rows kept waiting before new rows are dropped
+        """
+        self._max_batch_size = max_batch_size
+        self._max_delay = max_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        # Set by close() so the batch being collected is written without waiting out max_delay
+        self._stopping = asyncio.Event()
+        self._db = Postgress()
+
+    def put(self, table: TraceTable, record: Tuple[Any, ...]) -> None:
+        """
+        Queue a row for writing, starting the background task on first use.
+
+        Args:
+            table: Trace table the row is written to
+            record: Column values in the order of table.columns
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        try:
+            self._queue.put_nowait((table, record))
+        except asyncio.QueueFull:
+            logger.warning("Trace queue is full, dropping trace row")
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), self._max_delay)
+            while len(batch) < self._max_batch_size and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[TraceTable, Tuple[Any, ...]]]) -> None:
+        records_by_table = defaultdict(list)
+        for table, record in batch:
+            records_by_table[table].append(record)
+        for table, records in records_by_table.items():
+            try:
+                if len(records) >= _COPY_THRESHOLD:
+                    await self._db.copy_records(table.schema_name, table.table_name, table.columns, records)
+                else:
+                    await self._db.executemany(table.insert_sql, records)
+            except Exception as e:
+                # executemany and COPY are all or nothing, retried row by row so only the failing rows are lost
+                logger.warning(f"Failed to write {len(records)} trace rows to {table.table_name} as a batch, retrying them one by one: {e}")
+                await self._write_each(table, records)
+
+    async def _write_each(self, table: TraceTable, records: List[Tuple[Any, ...]]) -> None:
+        for record in records:
+            try:
+                await self._db.execute(table.insert_sql, *record)
+            except Exception as e:
+                logger.error(f"Dropping trace row for {table.table_name}: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        """
+        Stop the background task once it has written its current batch, then write the rows still queued.
+        """
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            self._stopping.set()
+            await self._queue.put(_STOP)
+            await task
+            self._stopping.clear()
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if batch:
+            await self._write(batch)
+
+
+TRACE_WRITER = TraceWriter()
 
 
 class AgentTrace:
@@ -12,52 +146,45 @@ class AgentTrace:
         self.db = Postgress()
 
     def save_agent_interaction_trace(self, task_id: str, input_payload: str, output_payload: str, status: str, execution_duration: float, target_agent_name: str = '') -> None:
-        query = """
-            INSERT INTO supplychain_assist.agent_interaction_trace
-            (context_id, task_id, source_agent_name, target_agent_name, input_payload, output_payload, status, execution_duration, execution_time)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, now())
-        """
-        self.db.execute_query(query, params=(self.conversation_id, task_id, self.agent_name, target_agent_name, input_payload, 
-                                             output_payload, status, execution_duration), 
-                              fetch=False)
+        TRACE_WRITER.put(_INTERACTION_TRACE, (self.conversation_id, task_id, self.agent_name, target_agent_name, input_payload,
+                                              output_payload, status, execution_duration, datetime.now()))
 
-    def save_agent_mcp_interaction_trace(self, task_id: str, tool_name: str, input_payload: str, output_payload: str, status: str, execution_duration:float) -> None:
-        query = """
-            INSERT INTO supplychain_assist.agent_mcp_interaction_trace
-            (context_id, task_id, agent_name, tool_name, input_payload, output_payload, status, execution_duration, execution_time)
-            VALUES (%s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s, now())
-        """
-        self.db.execute_query(query, 
-                              params=(self.conversation_id, task_id, self.agent_name, tool_name, Utilities.json_or_none(input_payload), 
-                                            Utilities.json_or_none(output_payload), status, execution_duration), fetch=False)
+    def save_agent_mcp_interaction_trace(self, task_id: str, tool_name: str, input_payload: Any, output_payload: Any, status: str, execution_duration:float) -> None:
+        # Encoded before queueing, a payload that cannot be encoded loses only this row and not the batch it would join
+        try:
+            input_json, output_json = json_param(input_payload), json_param(output_payload)
+        except Exception as e:
+            logger.error(f"Dropping MCP trace row for {tool_name}, payload cannot be encoded: {e}")
+            return
+        TRACE_WRITER.put(_MCP_INTERACTION_TRACE, (self.conversation_id, task_id, self.agent_name, tool_name, input_json,
+                                                  output_json, status, execution_duration, datetime.now()))
 
-    def save_agent_session( self, agent_state: AgentState, conversation_name: str = '') -> None:
+    async def save_agent_session( self, agent_state: AgentState, conversation_name: str = '') -> None:
         query = """
             INSERT INTO supplychain_assist.chat_session (context_id, conversation_name, user_id, 
                 agent_name, conversation, current_state, started_at, ended_at )
-                VALUES (%s, %s, %s, %s, %s::jsonb, %s::jsonb, now(), now())
+                VALUES ($1, $2, $3, $4, $5::jsonb, $6::jsonb, now(), now())
             ON CONFLICT (context_id, user_id, agent_name)
             DO UPDATE SET
                 conversation = EXCLUDED.conversation,
                 current_state = EXCLUDED.current_state,
                 ended_at = now()
         """
-        self.db.execute_query(
+        await self.db.execute(
             query,
-            params=( self.conversation_id, conversation_name, self.user_id, self.agent_name,
-                Utilities.json_or_none(agent_state.conversation), Utilities.json_or_none(agent_state.current_state)),
-            fetch=False
+            self.conversation_id, conversation_name, self.user_id, self.agent_name,
+            agent_state.conversation, agent_state.current_state
         )
 
-    def load_agent_session(self, agent_state: AgentState) -> AgentState:
+    async def load_agent_session(self, agent_state: AgentState) -> AgentState:
         query = """
             SELECT context_id, conversation_name, user_id, agent_name, conversation, current_state, started_at, ended_at
             FROM supplychain_assist.chat_session
-            WHERE context_id = %s AND agent_name = %s
+            WHERE context_id = $1 AND agent_name = $2
         """
-        rows = self.db.execute_query(
+        rows = await self.db.execute(
             query,
-            params=(self.conversation_id, self.agent_name),
+            self.conversation_id, self.agent_name,
             fetch=True
         )
         if not rows:
@@ -1,58 +1,87 @@
 import asyncio
-import json
+import inspect
+import logging
 import time
 from functools import wraps
 
+import orjson
+
 from app.agent.state import AgentState, CubeAssistBaseState
-from app.utils.agent_trace import AgentTrace
 from app.utils.logging import logger
 
 
+_SENTINEL = object()
+
+
+def _record_duration(log_label: str, duration: float, state) -> None:
+    if state:
+        step = getattr(state, "step", _SENTINEL)
+        selected_tool = getattr(state, "selected_tool", _SENTINEL)
+        if step is not _SENTINEL and selected_tool is not _SENTINEL:
+            msg = f"{log_label} - {selected_tool} for step - {step} execution time: {duration:.2f} seconds"
+        elif step is not _SENTINEL:
+            msg = f"{log_label} for step - {step} execution time: {duration:.2f} seconds"
+        else:
+            msg = f"{log_label} execution time: {duration:.2f} seconds"
+        state.event_log.append(msg)
+    else:
+        msg = f"{log_label} execution time: {duration:.2f} seconds"
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug({'message': msg})
+
+
+def _state_param(func) -> tuple:
+    """
+    Locate the state parameter of a decorated function once, at decoration time.
+
+    Args:
+        func: Function being decorated
+
+    Returns:
+        Tuple of (positional index, parameter name), (None, None) when the function takes no state
+    """
+    for index, (name, param) in enumerate(inspect.signature(func).parameters.items()):
+        annotation = param.annotation
+        if (isinstance(annotation, type) and issubclass(annotation, CubeAssistBaseState)) or name == "state":
+            return index, name
+    return None, None
+
+
+def _find_state(args: tuple, kwargs: dict, state_index, state_name):
+    if state_index is None:
+        return None
+    if state_index < len(args):
+        return args[state_index]
+    return kwargs.get(state_name)
+
+
+def _emit_timing(log_label: str, start: int, state) -> None:
+    """Shared finally block of the timed wrappers, start is a perf_counter_ns reading."""
+    # Without a state the message is only logged, skip building it when debug is off
+    if state or logger.isEnabledFor(logging.DEBUG):
+        _record_duration(log_label, (time.perf_counter_ns() - start) / 1e9, state)
+
+
 def timed(log_label: str):
     def decorator(func):
+        state_index, state_name = _state_param(func)
         if asyncio.iscoroutinefunction(func):
             @wraps(func)
             async def async_wrapper(*args, **kwargs):
-                start = time.time()
+                start = time.perf_counter_ns()
                 try:
-                    result = await func(*args, **kwargs)
-                    return result
+                    return await func(*args, **kwargs)
                 finally:
-                    duration = time.time() - start
-                    state = next((a for a in args if isinstance(a, CubeAssistBaseState)), None)
-                    if state:
-                        if hasattr(state,"selected_tool") and hasattr(state,"step"):
-                            msg = f"{log_label} - {state.selected_tool} for step - {state.step} execution time: {duration:.2f} seconds"
-                        elif hasattr(state,"step"):
-                            msg = f"{log_label} for step - {state.step} execution time: {duration:.2f} seconds"
-                        else:
-                            msg = f"{log_label} execution time: {duration:.2f} seconds"
-                        state.event_log.append(msg)
-                    else:
-                        msg = f"{log_label} execution time: {duration:.2f} seconds"
-                    logger.debug({'message': msg})
+                    _emit_timing(log_label, start, _find_state(args, kwargs, state_index, state_name))
             return async_wrapper
         else:
             @wraps(func)
-            def wrapper(self, *args, **kwargs):
-                start = time.time()
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
                 try:
-                    result = func(self, *args, **kwargs)
-                    return result
+                    return func(*args, **kwargs)
                 finally:
-                    duration = time.time() - start
-                    state = next((a for a in args if isinstance(a, CubeAssistBaseState)), None)
-                    if state:
-                        if hasattr(state,"selected_tool") and hasattr(state,"step"):
-                            msg = f"{log_label} - {state.selected_tool} for step - {state.step} execution time: {duration:.2f} seconds"
-                        elif hasattr(state,"step"):
-                            msg = f"{log_label} for step - {state.step} execution time: {duration:.2f} seconds"
-                        else:
-                            msg = f"{log_label} execution time: {duration:.2f} seconds"
-                        state.event_log.append(msg)
-                    else:
-                        msg = f"{log_label} execution time: {duration:.2f} seconds"
-                    logger.debug({'message': msg})
+                    _emit_timing(log_label, start, _find_state(args, kwargs, state_index, state_name))
             return wrapper
     return decorator
 
@@ -60,18 +89,24 @@ def trace_agent_interaction(log_label: str):
     def decorator(func):
         @wraps(func)
         async def wrapper(self, state: AgentState, selected_agent: any, agent_input: str, *args, **kwargs):
-            start = time.time()
+            start = time.perf_counter_ns()
             result = None
             try:
                 result = await func(self, state, selected_agent, agent_input, *args, **kwargs)
                 return result
             finally:
-                duration = time.time() - start
-                msg = f"{log_label} for step - {state.step} executing agent {selected_agent.get("name")} , paramaters: {agent_input} execution time: {duration:.2f} seconds"
+                duration = (time.perf_counter_ns() - start) / 1e9
+                target_agent_name = selected_agent.get("name")
+                msg = f"{log_label} for step - {state.step} executing agent {target_agent_name} , paramaters: {agent_input} execution time: {duration:.2f} seconds"
+                # Imported on the first traced call, not when a module using these decorators is imported,
+                # so the trace writer and database drivers load only in processes that record traces
+                from app.utils.agent_trace import AgentTrace
                 agent_trace = AgentTrace(conversation_id=state.context_id, agent_name=state.agent_name)
-                agent_trace.save_agent_interaction_trace(state.task_id, agent_input, json.dumps(state.output), state.status, duration , selected_agent.get("name"))
+                output_payload = orjson.dumps(state.output, option=orjson.OPT_NON_STR_KEYS).decode()
+                agent_trace.save_agent_interaction_trace(state.task_id, agent_input, output_payload, state.status, duration , target_agent_name)
                 state.event_log.append(msg)
-                logger.debug({'message': msg, 'agent_output': result})
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug({'message': msg, 'agent_output': result})
         return wrapper
     return decorator
 
@@ -79,19 +114,23 @@ def trace_mcp_interaction(log_label: str):
     def decorator(func):
         @wraps(func)
         async def wrapper(self, state: AgentState, tool_input: any, is_remote: bool, *args, **kwargs):
-            start = time.time()
+            start = time.perf_counter_ns()
             result = None
             try:
                 result = await func(self, state, tool_input, is_remote, *args, **kwargs)
                 return result
             finally:
-                duration = time.time() - start
-                satinized_input = tool_input
-                satinized_input['token'] = "****"  # Mask sensitive token info
+                duration = (time.perf_counter_ns() - start) / 1e9
+                # Mask sensitive token info on a copy, the trace row is written later by the background
+                # writer and must neither change with the caller's dict nor mask the caller's token
+                satinized_input = {**tool_input, 'token': "****"}
                 msg = f"{log_label} for step - {state.step} executing tool {state.selected_tool} , paramaters: {satinized_input} execution time: {duration:.2f} seconds"
+                # Imported on the first traced call, as in trace_agent_interaction
+                from app.utils.agent_trace import AgentTrace
                 agent_trace = AgentTrace(conversation_id=state.context_id, agent_name=state.agent_name)
                 agent_trace.save_agent_mcp_interaction_trace(state.task_id, state.selected_tool, satinized_input, result , state.status, duration)
                 state.event_log.append(msg)
-                logger.debug({'message': msg, 'tool_output': result})
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug({'message': msg, 'tool_output': result})
         return wrapper
     return decorator
@@ -1,47 +1,88 @@
 
 import json
-from typing import Any, Dict
+from types import MappingProxyType
+from typing import Any, Dict, Literal
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from .settings import SETTINGS
 
 
+# Browser headers that never change between calls, per-call headers are layered on top
+_STATIC_HEADERS = MappingProxyType({
+    "accept": "*/*",
+    "content-type": "application/json",
+    "x-path": "/",
+    "priority": "u=1, i",
+    "sec-ch-ua": '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"macOS"',
+    "sec-fetch-dest": "empty",
+    "sec-fetch-mode": "cors",
+    "sec-fetch-site": "same-site",
+    "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
+})
+
+UrlType = Literal["pipeline", "api-common"]
+
+# url_type to the SETTINGS attribute holding its endpoint, read per call so a settings reload is picked up
+_URL_SETTINGS = MappingProxyType({
+    "pipeline": "pipeline_graphql_url",
+    "api-common": "common_graphql_url",
+})
+
+
+def _build_session() -> requests.Session:
+    """
+    Build the HTTP session shared by all GraphQL clients.
+
+    Returns:
+        Session with a keep-alive connection pool, connection failures are retried with a short backoff
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=Retry(total=2, backoff_factor=0.1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
 class GraphQLClient:
+    # Shared across instances so sequential calls reuse open TCP/TLS connections
+    _session = _build_session()
+
     def __init__(self, token: str = None):
         self.token = token
 
-    def invoke(self, payload: Dict[str, Any] | str, url_type: str = "pipeline") -> Dict[str, Any]:
+    def invoke(self, payload: Dict[str, Any] | str, url_type: UrlType = "pipeline") -> Dict[str, Any]:
         # Select URL based on url_type
-        if url_type == "pipeline":
-            url = SETTINGS.pipeline_graphql_url
-        elif url_type == "api-common":
-            url = SETTINGS.common_graphql_url
-        else:
+        url_setting = _URL_SETTINGS.get(url_type)
+        if url_setting is None:
             raise ValueError(f"Unknown url_type: {url_type}")
+        return self._invoke(payload, getattr(SETTINGS, url_setting))
+
+    def invoke_pipeline(self, payload: Dict[str, Any] | str) -> Dict[str, Any]:
+        """Send payload to the pipeline GraphQL endpoint, same as invoke(payload, "pipeline") without the url_type lookup."""
+        return self._invoke(payload, SETTINGS.pipeline_graphql_url)
+
+    def invoke_common(self, payload: Dict[str, Any] | str) -> Dict[str, Any]:
+        """Send payload to the common API GraphQL endpoint, same as invoke(payload, "api-common") without the url_type lookup."""
+        return self._invoke(payload, SETTINGS.common_graphql_url)
 
+    def _invoke(self, payload: Dict[str, Any] | str, url: str) -> Dict[str, Any]:
         # Convert string payload to dict
         if isinstance(payload, str):
             payload = json.loads(payload)
 
         headers = {
-            "accept": "*/*",
+            **_STATIC_HEADERS,
             "authorization": f"{self.token}",
-            "content-type": "application/json",
             "origin": SETTINGS.pipeline_origin_url,
             "referer": SETTINGS.pipeline_referer_url,
-            "x-path": "/",
-            "priority": "u=1, i",
-            "sec-ch-ua": '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
-            "sec-ch-ua-mobile": "?0",
-            "sec-ch-ua-platform": '"macOS"',
-            "sec-fetch-dest": "empty",
-            "sec-fetch-mode": "cors",
-            "sec-fetch-site": "same-site",
-            "user-agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36",
         }
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = self._session.post(url, headers=headers, json=payload, timeout=30)
         if response.status_code == 200:
             return response.json()
         else:
-            raise RuntimeError(f"Request failed with status {response.status_code}: {response.text}")
+            raise RuntimeError(f"Request failed with status {response.status_code}: {response.text}")
\ No newline at end of file
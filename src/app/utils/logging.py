@@ -7,27 +7,49 @@ from pythonjsonlogger import jsonlogger
 
 from .settings import SETTINGS
 
+try:
+    # RE2 matches in linear time and releases the GIL, no backtracking on long JWT-like strings
+    import re2 as _token_re
+except ImportError:
+    _token_re = re
+
 
 class SanitizedJsonFormatter(jsonlogger.JsonFormatter):
     """Custom JSON formatter that sanitizes sensitive information."""
 
-    SENSITIVE_KEYS = {'token', 'password', 'secret', 'authorization', 'api_key', 'access_token'}
+    SENSITIVE_KEYS = frozenset({'token', 'password', 'secret', 'authorization', 'api_key', 'access_token'})
     TOKEN_PATTERNS = [
         r'eyJ[A-Za-z0-9-_]+\.eyJ[A-Za-z0-9-_]+\.[A-Za-z0-9-_]+',  # JWT tokens
         r'"token"\s*:\s*"[^"]*"',  # JSON token field
         r'\'token\'\s*:\s*\'[^\']*\''  # JSON token field with single quotes
     ]
+    # All patterns fused into one alternation so each message is scanned once
+    TOKEN_REGEX = _token_re.compile('|'.join(f'(?:{pattern})' for pattern in TOKEN_PATTERNS))
 
     def process_log_record(self, log_record: Dict[str, Any]) -> Dict[str, Any]:
         """Process and sanitize log records before formatting."""
         # Sanitize the message field
         if 'message' in log_record and isinstance(log_record['message'], str):
-            for pattern in self.TOKEN_PATTERNS:
-                log_record['message'] = re.sub(pattern, '[REDACTED]', log_record['message'])
+            log_record['message'] = self.TOKEN_REGEX.sub('[REDACTED]', log_record['message'])
+
+        # Redact structured fields by key, the record itself is ours to modify
+        for key, value in log_record.items():
+            log_record[key] = self._sanitize_value(key, value)
 
         # Process with parent class, passing the full log_record dict
         return super().process_log_record(log_record)
 
+    @classmethod
+    def _sanitize_value(cls, key: Any, value: Any) -> Any:
+        """Return value with sensitive keys redacted, nested containers are copied so logged payloads are not modified."""
+        if isinstance(key, str) and key.lower() in cls.SENSITIVE_KEYS:
+            return '[REDACTED]'
+        if isinstance(value, dict):
+            return {k: cls._sanitize_value(k, v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [cls._sanitize_value(None, item) for item in value]
+        return value
+
 def setup_logging():
     default_logger = logging.getLogger()
     default_logger.setLevel(SETTINGS.logging_level)
@@ -1,33 +1,158 @@
+import asyncio
 import time
+import weakref
+from typing import Dict, Optional
 
+import asyncpg
+import orjson
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 
 from .logging import logger
 from .settings import SETTINGS
 
+# jsonb's binary wire format is the JSON text behind a version byte
+_JSONB_VERSION = b'\x01'
+
+
+def _json_default(value):
+    # Workflow state may carry sets, anything else orjson cannot encode is stored as its string form
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def _encode_json(value) -> bytes:
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _encode_jsonb(value) -> bytes:
+    return _JSONB_VERSION + _encode_json(value)
+
+
+def json_param(value) -> Optional[orjson.Fragment]:
+    """Encode a json/jsonb parameter now instead of when the query runs, the pool codec writes it unchanged."""
+    if value is None:
+        return None
+    return orjson.Fragment(_encode_json(value))
+
+
+def _decode_jsonb(data: bytes):
+    return orjson.loads(data[1:])
+
+
+async def _init_connection(conn) -> None:
+    """Encode and decode json/jsonb parameters with orjson, callers pass and receive Python objects."""
+    await conn.set_type_codec('json', encoder=_encode_json, decoder=orjson.loads, schema='pg_catalog', format='binary')
+    await conn.set_type_codec('jsonb', encoder=_encode_jsonb, decoder=_decode_jsonb, schema='pg_catalog', format='binary')
+
 
 class Postgress:
+    # The extension only has to be ensured once per process, not on every connection
+    _extension_ready = False
+    # Pool for the async callers by event loop, created on first use. asyncpg pools and asyncio locks are bound
+    # to the loop they were created on, so a later loop (test runner, asyncio.run in a script) gets its own
+    _pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncpg.Pool]" = weakref.WeakKeyDictionary()
+    _pool_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+    # Settings pool each borrowed synchronous connection came from, by connection id, so it is returned
+    # there even if SETTINGS.reload() replaced the pool in the meantime
+    _connection_pools: Dict[int, ThreadedConnectionPool] = {}
+
+    @staticmethod
+    def _search_path() -> str:
+        return SETTINGS.search_path()
+
+    @classmethod
+    async def get_pool(cls, retries=3, delay=2) -> asyncpg.Pool:
+        loop = asyncio.get_running_loop()
+        pool = cls._pools.get(loop)
+        if pool is not None:
+            return pool
+        lock = cls._pool_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            attempt = 0
+            last_error = None
+            while loop not in cls._pools and attempt < retries:
+                try:
+                    cls._pools[loop] = await asyncpg.create_pool(
+                        host=SETTINGS.agent_db_host,
+                        database=SETTINGS.agent_db_name,
+                        user=SETTINGS.agent_db_user,
+                        password=SETTINGS.agent_db_password,
+                        port=SETTINGS.agent_db_port,
+                        server_settings={'search_path': cls._search_path()},
+                        min_size=2,
+                        max_size=10,
+                        init=_init_connection,
+                    )
+                except (asyncpg.InvalidPasswordError, asyncpg.CannotConnectNowError, OSError) as e:
+                    last_error = e
+                    attempt += 1
+                    if isinstance(e, asyncpg.InvalidPasswordError):
+                        logger.error("Database pool creation failed: password authentication failed.")
+                        SETTINGS.reload()
+                    else:
+                        # Server still starting up, or not reachable yet
+                        logger.error(f"Database pool creation failed: {e}")
+                    if attempt < retries:
+                        logger.info(f"Retrying database pool creation (attempt {attempt + 1}/{retries}) in {delay} seconds...")
+                        await asyncio.sleep(delay)
+            if loop not in cls._pools:
+                raise ConnectionError(f"Could not create the database pool after {retries} attempts: {last_error}") from last_error
+            return cls._pools[loop]
+
+    @classmethod
+    async def close_pool(cls) -> None:
+        """Close the running loop's pool, the next get_pool call opens a new one."""
+        pool = cls._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.close()
+
+    async def execute(self, query, *params, fetch=False):
+        """Run a query ($1..$N placeholders) on a pooled connection without blocking the event loop.
+        json/jsonb parameters are passed as Python objects, not pre-serialized strings.
+        Returns the fetched rows, or the command status (e.g. 'UPDATE 1') when fetch is False."""
+        pool = await Postgress.get_pool()
+        async with pool.acquire() as conn:
+            if fetch:
+                return await conn.fetch(query, *params)
+            return await conn.execute(query, *params)
+
+    async def executemany(self, query, records):
+        """Run a query once per parameter tuple in records, sent in a single round trip."""
+        pool = await Postgress.get_pool()
+        async with pool.acquire() as conn:
+            await conn.executemany(query, records)
+
+    async def copy_records(self, schema_name, table_name, columns, records):
+        """Bulk load records into a table with COPY."""
+        pool = await Postgress.get_pool()
+        async with pool.acquire() as conn:
+            await conn.copy_records_to_table(table_name, records=records, columns=columns, schema_name=schema_name)
+
     def get_connection(self, retries=3, delay=2):
+        """Borrow a connection from the settings pool, give it back with release_connection."""
         attempt = 0
+        last_error = None
         while attempt < retries:
             try:
-                conn = psycopg2.connect(
-                    host=SETTINGS.agent_db_host,
-                    database=SETTINGS.agent_db_name,
-                    user=SETTINGS.agent_db_user,
-                    password=SETTINGS.agent_db_password,
-                    port=SETTINGS.agent_db_port,
-                )
-                with conn.cursor() as cur:
-                    cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-                    # Include workflow schema first, then existing schemas
-                    search_path = f'{SETTINGS.workflow_schema},pipeline,{SETTINGS.cube_assist_schema},public'
-                    cur.execute(f'SET search_path TO {search_path};')
-                    conn.commit()
+                pool = SETTINGS.get_pool()
+                conn = pool.getconn()
+                if not Postgress._extension_ready:
+                    try:
+                        with conn.cursor() as cur:
+                            cur.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+                            conn.commit()
+                    except Exception:
+                        pool.putconn(conn, close=True)
+                        raise
+                    Postgress._extension_ready = True
+                Postgress._connection_pools[id(conn)] = pool
                 return conn
             except psycopg2.OperationalError as e:
                 if "password authentication failed" in str(e):
                     logger.error("Database connection failed: password authentication failed.")
+                    last_error = e
                     attempt += 1
                     SETTINGS.reload()
                     if attempt < retries:
@@ -35,6 +160,18 @@ class Postgress:
                         time.sleep(delay)
                 else:
                     raise
+        raise ConnectionError(f"Could not connect to the database after {retries} attempts: {last_error}") from last_error
+
+    def release_connection(self, conn):
+        """Return a connection from get_connection to the pool, rolling back anything left uncommitted."""
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                # Broken connection, the pool discards it below
+                conn.close()
+        pool = Postgress._connection_pools.pop(id(conn), None) or SETTINGS.get_pool()
+        pool.putconn(conn, close=bool(conn.closed))
 
     def execute_query(self, query, params=None, fetch=False):
         conn = None
@@ -50,4 +187,4 @@ class Postgress:
                 return result
         finally:
             if conn:
-                conn.close()
+                self.release_connection(conn)
@@ -1,8 +1,8 @@
-import inspect
+import sys
 import time
 from abc import ABC, abstractmethod
 from typing import Any
-import json
+import orjson
 from app.utils.logging import logger
 
 
@@ -15,21 +15,21 @@ class ProcessorBase(ABC):
         pass
 
     def process(self, *args, **kwargs) -> Any:
-        caller = inspect.stack()[1].function  # Get the calling function name
+        caller = sys._getframe(1).f_code.co_name  # Get the calling function name without walking the whole stack
         self._caller = caller  # Save for child access
         self.before_process(*args, **kwargs)
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         logger.info(f"{self.__class__.__name__} started processing. Called from: {self._caller}")
         try:
             result = self._process(*args, **kwargs)
         except Exception as e:
             logger.error(f"Error in VehicleListingAll: {e}", exc_info=True)
             result = self._create_error_message(e, self.__class__.__name__)
-        end_time = time.time()
-        execution_time = end_time - start_time
+        execution_time = (time.perf_counter_ns() - start_time) / 1e9
         logger.info(f"{self.__class__.__name__} finished processing in {execution_time:.2f} seconds. Called from: {self._caller}")
         self.after_process(result)
-        result=json.dumps(result,indent=2)
+        # Compact orjson output, callers parse the string rather than display it
+        result = orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS).decode()
         return result
 
     def before_process(self, *args, **kwargs):
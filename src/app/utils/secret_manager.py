@@ -1,13 +1,20 @@
 import json
+from functools import lru_cache
 
 import boto3
 
 
 class SecretManager:
     @staticmethod
-    def get_secrets(aws_region: str, secret_id: str) -> dict:
+    @lru_cache(maxsize=None)
+    def _client(aws_region: str):
+        # Building a boto3 client loads its service model, create one per region and reuse it for every secret
         session = boto3.session.Session()
-        client = session.client(service_name="secretsmanager", region_name=aws_region)
+        return session.client(service_name="secretsmanager", region_name=aws_region)
+
+    @staticmethod
+    def get_secrets(aws_region: str, secret_id: str) -> dict:
+        client = SecretManager._client(aws_region)
         get_secret_value_response = client.get_secret_value(SecretId=secret_id)
         if "SecretString" in get_secret_value_response:
             secret_dict = json.loads(get_secret_value_response["SecretString"])
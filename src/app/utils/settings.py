@@ -1,14 +1,73 @@
 
 import os
 import secrets
+import threading
 from dataclasses import dataclass
 
 from .secret_manager import SecretManager
-import psycopg2
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+# Seconds a synchronous query waits for a free pooled connection before PoolError is raised
+_POOL_WAIT_TIMEOUT = 30
+
+
+class _SettingsConnectionPool:
+    """
+    Wraps a ThreadedConnectionPool so callers beyond maxconn wait for a free connection instead of raising
+    PoolError, and so the pool can be retired: it is closed once the connections still checked out are returned.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._pool = ThreadedConnectionPool(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._borrowed = 0
+        self._retired = False
+
+    @property
+    def closed(self) -> bool:
+        return self._pool.closed
+
+    def getconn(self, key=None, timeout: float = _POOL_WAIT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolError(f"No database connection became free within {timeout} seconds")
+        try:
+            with self._lock:
+                conn = self._pool.getconn(key)
+                self._borrowed += 1
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            with self._lock:
+                # Connections of a retired pool were opened with the previous credentials
+                self._pool.putconn(conn, key, close or self._retired)
+                self._borrowed -= 1
+                if self._retired and not self._borrowed and not self._pool.closed:
+                    self._pool.closeall()
+        finally:
+            self._slots.release()
+
+    def closeall(self) -> None:
+        with self._lock:
+            if not self._pool.closed:
+                self._pool.closeall()
+
+    def retire(self) -> None:
+        """Close the pool now if no connection is checked out, otherwise when the last one is returned."""
+        with self._lock:
+            self._retired = True
+            if not self._borrowed and not self._pool.closed:
+                self._pool.closeall()
 
 @dataclass
 class Settings:
     _instance = None
+    # Opened with the database credentials, shared by load_from_db and the synchronous Postgress queries
+    _pool = None
     # aws keys
     aws_region = os.environ.get("AWS_REGION")
     app_secret_id = None
@@ -57,14 +116,32 @@ class Settings:
         app_secrets = SecretManager.get_secrets(self.aws_region, self.app_secret_id)
         self.openai_api_key = app_secrets.get('OPENAI_API_KEY')
       
+    def search_path(self) -> str:
+        # Include workflow schema first, then existing schemas
+        return f'{self.workflow_schema},pipeline,{self.cube_assist_schema},public'
+
+    def get_pool(self) -> _SettingsConnectionPool:
+        """
+        Return the process-wide psycopg2 pool, shared by load_from_db and Postgress.execute_query so the
+        startup loaders reuse one connection instead of connecting once each.
+        """
+        if Settings._pool is None:
+            Settings._pool = _SettingsConnectionPool(
+                1,
+                5,
+                host=self.agent_db_host,
+                database=self.agent_db_name,
+                user=self.agent_db_user,
+                password=self.agent_db_password,
+                port=self.agent_db_port,
+                # Sent as a startup parameter so it costs no extra round trip per connection
+                options=f'-c search_path={self.search_path()}',
+            )
+        return Settings._pool
+
     def load_from_db(self):
-        conn = psycopg2.connect(
-            host=self.agent_db_host,
-            database=self.agent_db_name,
-            user=self.agent_db_user,
-            password=self.agent_db_password,
-            port=self.agent_db_port,
-        )
+        pool = self.get_pool()
+        conn = pool.getconn()
         try:
             with conn.cursor() as cur:
                 query = """
@@ -84,11 +161,18 @@ class Settings:
                     else:
                         continue
                         # raise AttributeError(f"Unknown configuration key from DB: {key}")
+            # End the read transaction so the connection goes back to the pool idle
+            conn.rollback()
         finally:
-            conn.close()
+            pool.putconn(conn, close=bool(conn.closed))
 
     def reload(self):
         Settings._instance = None
+        # Pooled connections were opened with the previous credentials, connections other threads still
+        # hold go back to the old pool, which closes once they all have
+        pool, Settings._pool = Settings._pool, None
+        if pool is not None:
+            pool.retire()
 
 
 SETTINGS = Settings()
\ No newline at end of file
@@ -1,16 +1,31 @@
 
 import json
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-from jinja2 import Environment
-
+if TYPE_CHECKING:
+    from jinja2 import Environment, Template
 
 from app.utils.enums import TemplateName, TemplateType
+from app.utils.logging import logger
 from app.utils.postgress import Postgress
 
 
+@lru_cache(maxsize=1)
+def _template_env() -> "Environment":
+    """One environment for every template, templates are loaded from the database once so there is nothing to auto reload.
+    jinja2 is imported on first use so importing this module does not load it."""
+    from jinja2 import Environment
+    return Environment(auto_reload=False)
+
+
+# Shared read-only default for template lookups that miss
+_EMPTY_TEMPLATE = MappingProxyType({})
+
+
 class TemplateManager:
-    _instance = None
-    _initialized = False
+    _instances: dict[str, "TemplateManager"] = {}
 
     GET_TEMPLATE_BY_AGENT_NAME = """
         SELECT ts.template_id, ts.name, ts.template_text, ts.version, ts.template_type
@@ -25,46 +40,63 @@ class TemplateManager:
         INNER JOIN supplychain_assist.mcp_tools mt ON mt.tool_id = mtt.tool_id
         WHERE ts.template_type = 'API_TEMPLATE'
     """
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
+    def __new__(cls, agent_name: str, *args, **kwargs):
+        # One instance per agent, a single shared instance would serve the first agent's templates to every agent
+        instance = cls._instances.get(agent_name)
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instances[agent_name] = instance
+        return instance
 
     def __init__(self, agent_name: str):
-        if not TemplateManager._initialized:
-            TemplateManager._initialized = True
+        if not hasattr(self, '_template_cache'):
             self._agent_name = agent_name
+            # Templates of this agent by (template_type, template_name)
             self._template_cache = self._load_agent_templates()
+            # Compiled templates by (template_type, template_name), parsing dominates the render cost so it is
+            # done here at startup rather than on the first request
+            self._compiled: dict[tuple, "Template"] = self._compile_templates()
 
     def get_template(self, template_type: TemplateType, template_name: TemplateName, render: bool = False, **kwargs) -> str:
-        template_data = self._template_cache.get(self._agent_name, {}).get(template_type.value, {}).get(template_name.value, {})
-        prompt_text = template_data.get('prompt_text', '')
+        key = (template_type.value, template_name.value)
+        prompt_text = self._template_cache.get(key, _EMPTY_TEMPLATE).get('prompt_text', '')
         if not render:
             return prompt_text
-        template_env = Environment()
-        template = template_env.from_string(prompt_text)
+        template = self._compiled.get(key)
+        if template is None:
+            template = _template_env().from_string(prompt_text)
+            self._compiled[key] = template
         rendered_template = template.render(**kwargs)
         return rendered_template
 
     def render_template(self, template_type: TemplateType, template_name: TemplateName, **kwargs) -> str:
         return self.get_template(template_type, template_name, render=True, **kwargs)
 
+    def _compile_templates(self) -> dict[tuple, "Template"]:
+        from jinja2 import TemplateSyntaxError
+
+        compiled = {}
+        for key, template_data in self._template_cache.items():
+            prompt_text = template_data['prompt_text']
+            if not prompt_text:
+                continue
+            try:
+                compiled[key] = _template_env().from_string(prompt_text)
+            except TemplateSyntaxError as e:
+                # get_template compiles it when it is requested and raises the syntax error there, startup goes on
+                logger.warning(f"Template {key} could not be precompiled: {e}")
+        return compiled
+
     def _load_agent_templates(self):
         db = Postgress()
         rows = db.execute_query(self.GET_TEMPLATE_BY_AGENT_NAME, params=(self._agent_name,), fetch=True)
-        result = {}
-        result[self._agent_name] = {}
-        for row in rows:
-            template_type = row[4]
-            template_name = row[1]
-            if template_type not in result[self._agent_name]:
-                result[self._agent_name][template_type] = {}
-
-            result[self._agent_name][template_type][template_name] = {
-                'template_id': row[0],
-                'template_name': row[1],
-                'prompt_text': row[2],
-                'version': row[3],
-                'template_type': row[4],
+        return {
+            (template_type, template_name): {
+                'template_id': template_id,
+                'template_name': template_name,
+                'prompt_text': prompt_text,
+                'version': version,
+                'template_type': template_type,
             }
-        return result
+            for template_id, template_name, prompt_text, version, template_type in rows
+        }
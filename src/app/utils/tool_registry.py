@@ -36,9 +36,8 @@ class ToolRegistry:
             query = "SELECT name, description FROM supplychain_assist.mcp_tools"
             rows = db.execute_query(query, fetch=True)
 
-            descriptions = {}
-            for tool_name, description in rows:
-                descriptions[tool_name] = description
+            # Rows are already (name, description) pairs
+            descriptions = dict(rows)
 
             logger.info(f"✓ Cached {len(descriptions)} tool descriptions")
             return descriptions
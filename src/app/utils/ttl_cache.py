@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+ValueT = TypeVar("ValueT")
+
+
+class TTLCache(Generic[ValueT]):
+    """
+    Least recently used cache with an optional time to live per entry.
+    Not thread safe, callers use it from the event loop or one thread at a time.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize: Entries kept before the least recently used one is evicted
+            ttl: Seconds an entry stays valid after it was put, None keeps entries until they are evicted
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[Optional[float], ValueT]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value cached for key and mark it as recently used.
+
+        Args:
+            key: Cache key
+            default: Returned when key is not cached or its entry expired
+
+        Returns:
+            Cached value or default
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: ValueT) -> None:
+        """
+        Cache value for key, evicting the least recently used entry when the cache is full.
+
+        Args:
+            key: Cache key
+            value: Value to cache, None included
+        """
+        expires_at = time.monotonic() + self._ttl if self._ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,7 @@
-import json
+import functools
 from typing import Any, Optional, Dict, List
 import re
+import orjson
 from app.utils.logging import logger
 
 from jsonpath_ng import parse as jsonpath_parse
@@ -13,7 +14,9 @@ class Utilities:
         if payload is None:
             return None
         try:
-            return json.dumps(payload, ensure_ascii=False)
+            # Not byte-identical to the former json.dumps(ensure_ascii=False): separators are compact, datetime,
+            # UUID and dataclass values are serialized instead of returning None, NaN/Infinity become null
+            return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS).decode()
         except Exception:
             return None
 
@@ -103,7 +106,33 @@ class Utilities:
             return []
 
     @staticmethod
-    def extract_json_path_value(data: Dict[str, Any], json_path: str) -> Any:
+    def _is_complex_filter(json_path: str) -> bool:
+        return '[?(@.' in json_path and '$.' in json_path and '==' in json_path
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def compile_json_path(json_path: str) -> Any:
+        """
+        Parse a JSONPath expression once so it can be reused across extract_json_path_value calls.
+
+        Args:
+            json_path: JSONPath expression
+
+        Returns:
+            Parsed jsonpath-ng expression, None for complex filters which are resolved manually
+
+        Raises:
+            Exception: If the expression cannot be parsed
+        """
+        if Utilities._is_complex_filter(json_path):
+            return None
+        # Use extended parser for filter expressions
+        if '[?' in json_path:
+            return jsonpath_ext_parse(json_path)
+        return jsonpath_parse(json_path)
+
+    @staticmethod
+    def extract_json_path_value(data: Dict[str, Any], json_path: str, compiled_path: Any = None) -> Any:
         """
         Extract value from nested dictionary using JSONPath notation.
         Supports complex JSONPath expressions including filters and recursive descent.
@@ -111,6 +140,7 @@ class Utilities:
         Args:
             data: Dictionary to extract from
             json_path: JSONPath expression
+            compiled_path: Optional expression returned by compile_json_path for json_path
             
         Returns:
             Extracted value or list of values, None if not found
@@ -122,7 +152,7 @@ class Utilities:
         
         try:
             # Handle complex filter expressions manually
-            if '[?(@.' in json_path and '$.' in json_path and '==' in json_path:
+            if compiled_path is None and Utilities._is_complex_filter(json_path):
                 logger.info(f"Handling complex filter expression: {json_path}")
                 results = Utilities._handle_complex_filter(data, json_path)
                 
@@ -135,11 +165,7 @@ class Utilities:
             
             # Try with jsonpath-ng first (better filter support)
             try:
-                # Use extended parser for filter expressions
-                if '[?' in json_path:
-                    jsonpath_expr = jsonpath_ext_parse(json_path)
-                else:
-                    jsonpath_expr = jsonpath_parse(json_path)
+                jsonpath_expr = compiled_path if compiled_path is not None else Utilities.compile_json_path(json_path)
                 
                 matches = jsonpath_expr.find(data)
                 
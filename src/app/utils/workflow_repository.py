@@ -142,7 +142,7 @@ class WorkflowRepository:
             logger.error(f"Failed to get workflows for roles '{user_roles}': {e}", exc_info=True)
             raise
 
-    def get_input_required_workflow_run(self, workflow_run_id: str) -> Optional[Tuple]:
+    async def get_input_required_workflow_run(self, workflow_run_id: str) -> Optional[Tuple]:
         """
         Get the workflow_id, step_id, step_run_id, and workflow_state that requires input 
         for the given workflow run. Returns data from the latest input-required record.
@@ -157,8 +157,8 @@ class WorkflowRepository:
         query = """
         SELECT workflow_id, step_id, step_run_id, workflow_state
         FROM workflow_run 
-        WHERE workflow_run_id = %s 
-        AND status = %s
+        WHERE workflow_run_id = $1 
+        AND status = $2
         ORDER BY created_at DESC
         LIMIT 1
         """
@@ -166,7 +166,7 @@ class WorkflowRepository:
         params = (workflow_run_id, TaskState.input_required.value)
         
         try:
-            results = self.db.execute_query(query, params, fetch=True)
+            results = await self.db.execute(query, *params, fetch=True)
             
             if results:
                 logger.info(f"Found input-required step for workflow_run_id: {workflow_run_id}")
@@ -1,12 +1,18 @@
 from typing import Optional, List, Dict, Any
-import functools
 import json
 from functools import partial
 from langgraph.graph import StateGraph, START, END
 from app.utils.logging import logger
+from app.utils.ttl_cache import TTLCache
 from app.utils.workflow_repository import WorkflowRepository
 from a2a.types import TaskState
 
+# Workflow definitions are shared by every service instance and re-read once they are older than the TTL
+_WORKFLOW_CACHE_SIZE = 128
+_WORKFLOW_CACHE_TTL = 300
+_MISSING = object()
+_workflow_cache: TTLCache[Any] = TTLCache(_WORKFLOW_CACHE_SIZE, _WORKFLOW_CACHE_TTL)
+
 
 class WorkflowService:
     """
@@ -17,7 +23,6 @@ class WorkflowService:
     def __init__(self):
         self.repository = WorkflowRepository()
 
-    @functools.lru_cache(maxsize=32)
     def get_steps_by_workflow_id(self, workflow_id: str, user_roles: tuple[str, ...]) -> Optional[Dict[str, Any]]:
         """
         Retrieve workflow details along with its steps by workflow_id from database.
@@ -38,6 +43,14 @@ class WorkflowService:
         if not user_roles:
             raise ValueError("user_roles is required")
 
+        cache_key = ("steps", workflow_id, user_roles)
+        workflow = _workflow_cache.get(cache_key, _MISSING)
+        if workflow is _MISSING:
+            workflow = self._load_steps_by_workflow_id(workflow_id, user_roles)
+            _workflow_cache.put(cache_key, workflow)
+        return workflow
+
+    def _load_steps_by_workflow_id(self, workflow_id: str, user_roles: tuple[str, ...]) -> Optional[Dict[str, Any]]:
         # Get raw data from repository
         result = self.repository.get_workflow_with_steps(workflow_id, user_roles)
         
@@ -115,7 +128,6 @@ class WorkflowService:
         logger.info(f"Retrieved workflow: {workflow['name']} with {len(workflow['steps'])} steps for roles '{user_roles}'")
         return workflow
 
-    @functools.lru_cache(maxsize=32)
     def get_all_workflows(self, user_roles: tuple) -> List[Dict[str, Any]]:
         """
         Retrieve all workflows accessible by any of the given user roles.
@@ -133,6 +145,14 @@ class WorkflowService:
         if not user_roles or not isinstance(user_roles, tuple):
             raise ValueError("user_roles must be a non-empty tuple")
 
+        cache_key = ("all", user_roles)
+        workflows = _workflow_cache.get(cache_key, _MISSING)
+        if workflows is _MISSING:
+            workflows = self._load_all_workflows(user_roles)
+            _workflow_cache.put(cache_key, workflows)
+        return workflows
+
+    def _load_all_workflows(self, user_roles: tuple) -> List[Dict[str, Any]]:
         workflows = []
         seen_workflow_ids = set()  # Prevent duplicates across roles
         
@@ -191,7 +211,7 @@ class WorkflowService:
         logger.info(f"Retrieved {len(workflows)} unique workflows across roles {user_roles}")
         return workflows
 
-    def get_input_required_step(self, workflow_run_id: str) -> Optional[Dict[str, Any]]:
+    async def get_input_required_step(self, workflow_run_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the workflow_id, step_id, step_run_id, and workflow_state that requires input for the given workflow run.
         Returns data from the latest input-required record.
@@ -207,7 +227,7 @@ class WorkflowService:
             Exception: If database query fails
         """
         # Get raw data from repository
-        results = self.repository.get_input_required_workflow_run(workflow_run_id)
+        results = await self.repository.get_input_required_workflow_run(workflow_run_id)
         
         if not results:
             return None
@@ -217,7 +237,7 @@ class WorkflowService:
         step_run_id = results[2]
         workflow_state_raw = results[3]
         
-        # JSONB field returns as dict already - no JSON parsing needed
+        # JSONB field is decoded by the pool's codec - no JSON parsing needed
         workflow_state = workflow_state_raw if workflow_state_raw else {}
         
         logger.info(f"Found input-required step: {step_id} in workflow: {workflow_id} (step_run_id: {step_run_id}) for workflow_run_id: {workflow_run_id}")
@@ -0,0 +1,100 @@
+"""
+Stand-ins for the services the unit tests do not reach: the settings loaded from AWS Secrets Manager and the
+database, asyncpg and the MCP client SDK. Import this module before any app module.
+"""
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+def _install_settings() -> None:
+    # Settings() reads secrets and agent config on import, the tests only need the attributes
+    settings = types.ModuleType('app.utils.settings')
+    settings.Settings = object
+    settings.SETTINGS = types.SimpleNamespace(
+        app_name='test-agent', env='test', logging_level='INFO', app_logging_level='INFO',
+        cubeassist_mcp_server_url='http://localhost/mcp', a2a_server_url='http://localhost',
+        pipeline_graphql_url='http://localhost/graphql', common_graphql_url='http://localhost/graphql',
+        pipeline_origin_url='', pipeline_referer_url='', python_exe=sys.executable,
+        workflow_schema='workflows', cube_assist_schema='supplychain_assist',
+        agent_db_host='localhost', agent_db_name='test', agent_db_user='test', agent_db_password='test',
+        agent_db_port=5432, search_path=lambda: 'workflows,pipeline,supplychain_assist,public',
+    )
+    sys.modules['app.utils.settings'] = settings
+
+
+def _install_asyncpg() -> None:
+    try:
+        import asyncpg  # noqa: F401
+        return
+    except ImportError:
+        pass
+    asyncpg = types.ModuleType('asyncpg')
+
+    class InvalidPasswordError(Exception):
+        pass
+
+    class CannotConnectNowError(Exception):
+        pass
+
+    async def create_pool(**kwargs):
+        raise OSError('asyncpg is not available in the unit tests')
+
+    asyncpg.Pool = object
+    asyncpg.InvalidPasswordError = InvalidPasswordError
+    asyncpg.CannotConnectNowError = CannotConnectNowError
+    asyncpg.create_pool = create_pool
+    sys.modules['asyncpg'] = asyncpg
+
+
+def _install_mcp() -> None:
+    try:
+        import mcp  # noqa: F401
+        return
+    except ImportError:
+        pass
+
+    class McpError(Exception):
+        pass
+
+    class ClientSession:
+        def __init__(self, read_stream, write_stream):
+            pass
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            return None
+
+        async def initialize(self):
+            return None
+
+        async def call_tool(self, name, arguments=None):
+            raise McpError('MCP is not available in the unit tests')
+
+    def _unavailable_client(*args, **kwargs):
+        raise OSError('MCP is not available in the unit tests')
+
+    modules = {name: types.ModuleType(name) for name in (
+        'mcp', 'mcp.client', 'mcp.client.stdio', 'mcp.client.streamable_http', 'mcp.shared', 'mcp.shared.exceptions',
+    )}
+    modules['mcp'].ClientSession = ClientSession
+    modules['mcp'].StdioServerParameters = types.SimpleNamespace
+    modules['mcp.client.stdio'].stdio_client = _unavailable_client
+    modules['mcp.client.streamable_http'].streamablehttp_client = _unavailable_client
+    modules['mcp.shared.exceptions'].McpError = McpError
+    sys.modules.update(modules)
+
+
+def install_stubs() -> None:
+    # ENV=local runs the integration tests against the real settings
+    if os.environ.get('ENV') != 'local' and 'app.utils.settings' not in sys.modules:
+        _install_settings()
+    _install_asyncpg()
+    _install_mcp()
+
+
+install_stubs()
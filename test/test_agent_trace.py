@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+import unittest.mock
+
+import stubs  # noqa: F401
+
+import orjson
+
+from app.utils import agent_trace
+from app.utils.agent_trace import AgentTrace, TraceWriter, _INTERACTION_TRACE, _MCP_INTERACTION_TRACE
+
+
+class RecordingDB:
+    def __init__(self, write_delay: float = 0, bad_record=None):
+        self.write_delay = write_delay
+        # Rejected like a row violating a constraint, failing every batch it is part of
+        self.bad_record = bad_record
+        self.rows = []
+
+    async def execute(self, query, *params, fetch=False):
+        if params == self.bad_record:
+            raise ValueError("bad row")
+        self.rows.append(params)
+
+    async def executemany(self, query, records):
+        await asyncio.sleep(self.write_delay)
+        if self.bad_record in records:
+            raise ValueError("bad row")
+        self.rows.extend(records)
+
+    async def copy_records(self, schema_name, table_name, columns, records):
+        await asyncio.sleep(self.write_delay)
+        self.rows.extend(records)
+
+
+class TraceWriterTest(unittest.IsolatedAsyncioTestCase):
+    def writer(self, **kwargs) -> TraceWriter:
+        writer = TraceWriter(**kwargs)
+        writer._db = RecordingDB()
+        return writer
+
+    async def test_rows_are_written_in_one_batch(self):
+        writer = self.writer(max_delay=0.01)
+        for i in range(3):
+            writer.put(_INTERACTION_TRACE, (i,))
+        writer.put(_MCP_INTERACTION_TRACE, (3,))
+        await asyncio.sleep(0.05)
+        self.assertEqual(sorted(writer._db.rows), [(0,), (1,), (2,), (3,)])
+        await writer.close()
+
+    async def test_close_writes_the_batch_in_flight(self):
+        writer = self.writer(max_delay=0.01)
+        writer._db.write_delay = 0.05
+        writer.put(_INTERACTION_TRACE, (1,))
+        # The background task has dequeued the row and is writing it when close() is called
+        await asyncio.sleep(0.02)
+        self.assertTrue(writer._queue.empty())
+        writer.put(_INTERACTION_TRACE, (2,))
+        await writer.close()
+        self.assertEqual(writer._db.rows, [(1,), (2,)])
+
+    async def test_close_writes_rows_queued_before_the_first_flush(self):
+        writer = self.writer(max_delay=10)
+        writer.put(_INTERACTION_TRACE, (1,))
+        writer.put(_INTERACTION_TRACE, (2,))
+        await asyncio.wait_for(writer.close(), 1)
+        self.assertEqual(writer._db.rows, [(1,), (2,)])
+
+    async def test_failing_row_does_not_drop_the_batch(self):
+        writer = self.writer(max_delay=10)
+        writer._db.bad_record = (2,)
+        for i in range(4):
+            writer.put(_INTERACTION_TRACE, (i,))
+        await writer.close()
+        self.assertEqual(writer._db.rows, [(0,), (1,), (3,)])
+
+    async def test_close_without_rows(self):
+        writer = self.writer()
+        await writer.close()
+        self.assertEqual(writer._db.rows, [])
+
+
+class AgentTraceTest(unittest.IsolatedAsyncioTestCase):
+    async def test_mcp_payloads_are_encoded_when_queued(self):
+        writer = TraceWriter()
+        writer._db = RecordingDB()
+        with unittest.mock.patch.object(agent_trace, 'TRACE_WRITER', writer):
+            trace = AgentTrace(conversation_id='c', agent_name='agent')
+            tool_input = {'order_id': 1, 'tags': {'a'}}
+            trace.save_agent_mcp_interaction_trace('t', 'get_order', tool_input, {'ok': True}, 'completed', 0.1)
+            # A later change to the caller's dict is not in the queued row
+            tool_input['order_id'] = 2
+            # Circular payloads cannot be encoded, only this row is dropped
+            circular = {}
+            circular['self'] = circular
+            trace.save_agent_mcp_interaction_trace('t', 'broken', circular, None, 'failed', 0.1)
+            await writer.close()
+        self.assertEqual(len(writer._db.rows), 1)
+        row = writer._db.rows[0]
+        self.assertEqual(orjson.loads(orjson.dumps(row[4])), {'order_id': 1, 'tags': ['a']})
+        self.assertEqual(orjson.loads(orjson.dumps(row[5])), {'ok': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
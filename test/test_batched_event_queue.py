@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+import stubs  # noqa: F401
+
+from app.a2a.batched_event_queue import BatchedEventQueue
+
+
+class RecordingEventQueue:
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.events = []
+
+    async def enqueue_event(self, event):
+        if event == self.fail_on:
+            raise RuntimeError(f"cannot enqueue {event}")
+        self.events.append(event)
+
+
+class BatchedEventQueueTest(unittest.IsolatedAsyncioTestCase):
+    async def test_full_batch_is_forwarded(self):
+        event_queue = RecordingEventQueue()
+        batched_queue = BatchedEventQueue(event_queue, max_batch_size=2, max_delay=10)
+        await batched_queue.enqueue_event(1)
+        self.assertEqual(event_queue.events, [])
+        await batched_queue.enqueue_event(2)
+        self.assertEqual(event_queue.events, [1, 2])
+
+    async def test_timer_flush_and_exit_keep_order(self):
+        event_queue = RecordingEventQueue()
+        async with BatchedEventQueue(event_queue, max_batch_size=16, max_delay=0.01) as batched_queue:
+            await batched_queue.enqueue_event(1)
+            await asyncio.sleep(0.05)
+            self.assertEqual(event_queue.events, [1])
+            await batched_queue.enqueue_event(2)
+            await batched_queue.enqueue_event(3)
+        self.assertEqual(event_queue.events, [1, 2, 3])
+
+    async def test_exit_raises_the_timer_flush_error(self):
+        event_queue = RecordingEventQueue(fail_on=1)
+        with self.assertRaises(RuntimeError):
+            async with BatchedEventQueue(event_queue, max_delay=0.01) as batched_queue:
+                await batched_queue.enqueue_event(1)
+                await asyncio.sleep(0.05)
+
+    async def test_exit_waits_for_the_running_timer_flush(self):
+        class SlowEventQueue(RecordingEventQueue):
+            async def enqueue_event(self, event):
+                await asyncio.sleep(0.05)
+                await super().enqueue_event(event)
+
+        event_queue = SlowEventQueue()
+        async with BatchedEventQueue(event_queue, max_delay=0.01) as batched_queue:
+            await batched_queue.enqueue_event(1)
+            await asyncio.sleep(0.02)
+        self.assertEqual(event_queue.events, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import stubs  # noqa: F401
+
+from app.utils import postgress
+from app.utils.postgress import Postgress
+
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class GetPoolTest(unittest.TestCase):
+    def tearDown(self):
+        Postgress._pools.clear()
+
+    def test_each_event_loop_gets_its_own_pool(self):
+        async def create_pool(**kwargs):
+            return FakePool()
+
+        async def get_twice():
+            return await Postgress.get_pool(), await Postgress.get_pool()
+
+        with patch.object(postgress.asyncpg, "create_pool", create_pool):
+            first, again = asyncio.run(get_twice())
+            second, _ = asyncio.run(get_twice())
+        self.assertIs(first, again)
+        self.assertIsNot(first, second)
+
+    def test_connection_refused_is_retried(self):
+        pool = FakePool()
+        attempts = []
+
+        async def create_pool(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise ConnectionRefusedError("database is starting up")
+            return pool
+
+        async def get_and_close():
+            got = await Postgress.get_pool(delay=0)
+            await Postgress.close_pool()
+            return got
+
+        with patch.object(postgress.asyncpg, "create_pool", create_pool), \
+                patch.object(postgress.SETTINGS, "reload", create=True) as reload:
+            self.assertIs(asyncio.run(get_and_close()), pool)
+        self.assertEqual(len(attempts), 2)
+        reload.assert_not_called()
+        self.assertTrue(pool.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
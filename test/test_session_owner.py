@@ -0,0 +1,55 @@
+import asyncio
+import unittest
+from contextlib import AsyncExitStack
+
+import stubs  # noqa: F401
+
+from app.mcp.session_owner import SessionOwner
+
+
+def _owner(on_exit):
+    async def open_session(exit_stack: AsyncExitStack):
+        exit_stack.push_async_callback(on_exit)
+        return object()
+
+    return SessionOwner(open_session)
+
+
+class SessionOwnerCloseTest(unittest.IsolatedAsyncioTestCase):
+    async def test_transport_cancelled_on_exit_is_not_raised(self):
+        async def on_exit():
+            raise asyncio.CancelledError()
+
+        owner = _owner(on_exit)
+        await owner.get()
+        await owner.close()
+        # The next get() opens a new session
+        self.assertIsNotNone(await owner.get())
+        await owner.close()
+
+    async def test_transport_error_on_exit_is_not_raised(self):
+        async def on_exit():
+            raise OSError("connection reset")
+
+        owner = _owner(on_exit)
+        await owner.get()
+        await owner.close()
+
+    async def test_caller_cancelled_while_closing_is_raised(self):
+        exiting = asyncio.Event()
+
+        async def on_exit():
+            exiting.set()
+            await asyncio.sleep(10)
+
+        owner = _owner(on_exit)
+        await owner.get()
+        closing = asyncio.create_task(owner.close())
+        await exiting.wait()
+        closing.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await closing
+
+
+if __name__ == '__main__':
+    unittest.main()
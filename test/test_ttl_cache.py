@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import patch
+
+import stubs  # noqa: F401
+
+from app.utils.ttl_cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+        self.assertEqual(len(cache), 2)
+
+    def test_expired_entry_is_a_miss(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=100.0):
+            cache.put("a", 1)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=159.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("app.utils.ttl_cache.time.monotonic", return_value=161.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_cached_none_is_told_apart_with_a_default(self):
+        missing = object()
+        cache = TTLCache(maxsize=2)
+        cache.put("a", None)
+        self.assertIsNone(cache.get("a", missing))
+        self.assertIs(cache.get("b", missing), missing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import stubs  # noqa: F401
+
+from a2a.types import TaskState
+
+from app.agent.workflow_decorators import _COMPLETION_DELTA_SQL, _state_delta, process_workflow_run
+from app.agent.workflow_state import WorkflowState
+
+
+class RecordingDB:
+    def __init__(self):
+        self.calls = []
+
+    async def execute(self, query, *params, fetch=False):
+        self.calls.append((query, params))
+        return "UPDATE 1"
+
+
+class StateDeltaTest(unittest.TestCase):
+    def test_set_changed_and_removed_keys(self):
+        before = {"kept": "a", "changed": 1, "removed": True}
+        after = {"kept": "a", "changed": 2, "added": [1]}
+        changed, removed = _state_delta(before, after)
+        self.assertEqual(changed, {"changed": 2, "added": [1]})
+        self.assertEqual(removed, ["removed"])
+
+    def test_equal_values_are_not_changes(self):
+        changed, removed = _state_delta({"orders": [1, 2]}, {"orders": [1, 2]})
+        self.assertEqual(changed, {})
+        self.assertEqual(removed, [])
+
+
+class ProcessWorkflowRunTest(unittest.IsolatedAsyncioTestCase):
+    async def test_delta_includes_nested_in_place_mutation(self):
+        db = RecordingDB()
+
+        @process_workflow_run(db=db)
+        async def handler(self, step_detail, workflow_state):
+            # Mutates a nested value in place instead of assigning the key
+            workflow_state.workflow_state["order"]["lines"].append({"sku": "B"})
+            workflow_state.workflow_state["order"]["status"] = "open"
+            workflow_state.task_state = "completed"
+            return workflow_state
+
+        workflow_state = WorkflowState(
+            workflow_id="w", workflow_run_id="r",
+            workflow_state={"order": {"lines": [{"sku": "A"}], "status": "draft"}, "untouched": 1},
+        )
+        await handler(None, {"step_id": "s1"}, workflow_state)
+
+        delta_calls = [params for query, params in db.calls if query == _COMPLETION_DELTA_SQL]
+        self.assertEqual(len(delta_calls), 1)
+        step_run_id, completed_at, removed_keys, changed_state = delta_calls[0][:4]
+        self.assertEqual(removed_keys, [])
+        self.assertEqual(changed_state, {"order": {"lines": [{"sku": "A"}, {"sku": "B"}], "status": "open"}})
+
+    async def run_step(self, task_state):
+        db = RecordingDB()
+
+        @process_workflow_run(db=db)
+        async def handler(self, step_detail, workflow_state):
+            workflow_state.task_state = task_state
+            return workflow_state
+
+        workflow_state = WorkflowState(workflow_id="w", workflow_run_id="r", current_step_run_id="run-1")
+        result_state = await handler(None, {"step_id": "s1"}, workflow_state)
+        status = next(params[4] for query, params in db.calls if query == _COMPLETION_DELTA_SQL)
+        return result_state.current_step_run_id, status
+
+    async def test_input_required_keeps_the_step_run_for_the_resume(self):
+        # Handlers set either the TaskState member or its value
+        for task_state in (TaskState.input_required, TaskState.input_required.value):
+            with self.subTest(task_state=task_state):
+                step_run_id, status = await self.run_step(task_state)
+                self.assertEqual(step_run_id, "run-1")
+                self.assertEqual(status, TaskState.input_required.value)
+
+    async def test_other_states_start_a_new_step_run(self):
+        for task_state in (TaskState.completed, TaskState.completed.value, TaskState.failed):
+            with self.subTest(task_state=task_state):
+                step_run_id, status = await self.run_step(task_state)
+                self.assertNotEqual(step_run_id, "run-1")
+                self.assertEqual(status, getattr(task_state, "value", task_state))
+
+
+if __name__ == '__main__':
+    unittest.main()
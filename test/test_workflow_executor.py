@@ -0,0 +1,202 @@
+import ast
+import asyncio
+import inspect
+import types
+import unittest
+from unittest.mock import patch
+
+import stubs  # noqa: F401
+
+import orjson
+
+from app.agent import workflow_decorators
+
+from app.agent.workflow_executor import (
+    WorkflowExecutor, _SAFE_EVAL_GLOBALS, _eval_node, _is_interpretable, _parse_rendered_condition
+)
+from app.agent.workflow_state import WorkflowState
+
+
+def _parse(condition: str) -> ast.expr:
+    return ast.parse(condition, mode="eval").body
+
+
+class ConditionInterpreterTest(unittest.TestCase):
+    CONTEXT = {"answer": "yes", "count": 3, "items": ["a", "b"], "missing": None, "flag": False}
+
+    def test_matches_eval(self):
+        conditions = [
+            "answer == 'yes'",
+            "answer != 'yes'",
+            "count > 2 and count <= 3",
+            "1 < count < 3",
+            "'a' in items",
+            "'c' not in items",
+            "missing is None",
+            "flag is not None",
+            "not flag",
+            "flag or count",
+            "flag and count",
+            "-count == -3",
+            "answer in ('yes', 'y')",
+            "count in {1, 2, 3}",
+            "items == ['a', 'b']",
+        ]
+        for condition in conditions:
+            with self.subTest(condition=condition):
+                tree = _parse(condition)
+                self.assertTrue(_is_interpretable(tree))
+                expected = eval(compile(condition, "<rule>", "eval"), _SAFE_EVAL_GLOBALS, dict(self.CONTEXT))
+                self.assertEqual(_eval_node(tree, self.CONTEXT), expected)
+
+    def test_bool_op_short_circuits(self):
+        # The right operand would raise KeyError if it were evaluated
+        self.assertIs(_eval_node(_parse("flag and undefined"), self.CONTEXT), False)
+        self.assertEqual(_eval_node(_parse("answer or undefined"), self.CONTEXT), "yes")
+
+    def test_unsupported_expressions_are_not_interpretable(self):
+        for condition in ("len(items) > 1", "answer.upper() == 'YES'", "count + 1 == 4", "items[0] == 'a'", "count if flag else 0"):
+            with self.subTest(condition=condition):
+                self.assertFalse(_is_interpretable(_parse(condition)))
+
+    def test_parse_rendered_condition(self):
+        self.assertIsNotNone(_parse_rendered_condition(" 'x' == 'x' "))
+        self.assertIsNone(_parse_rendered_condition("len('x') == 1"))
+
+
+class CompileOrchestrationRulesTest(unittest.TestCase):
+    def test_compiled_per_rule(self):
+        step = {"step_id": "s1", "user_interaction": {"orchestration_rules": [
+            {"condition": "answer == 'skip'", "go_to_step": "s3"},
+            {"condition": "len(answer) > 3", "go_to_step": "s3"},
+            {"condition": "{{ answer == 'jinja' }}", "go_to_step": "s3"},
+            {"condition": "answer ==", "go_to_step": "s3"},
+            {"go_to_step": "s3"},
+        ]}}
+        python_rule, eval_rule, jinja_rule, invalid_rule, no_condition = WorkflowExecutor()._compile_orchestration_rules(step)
+
+        self.assertIsNotNone(python_rule.tree)
+        self.assertEqual(python_rule.variables, frozenset({"answer"}))
+        self.assertIsNone(eval_rule.tree)
+        self.assertIsNotNone(eval_rule.code)
+        self.assertIsNotNone(jinja_rule.template)
+        self.assertEqual(jinja_rule.variables, frozenset({"answer"}))
+        self.assertIsNone(invalid_rule)
+        self.assertIsNone(no_condition)
+        # The step definition is not modified
+        self.assertEqual(set(step["user_interaction"]["orchestration_rules"][0]), {"condition", "go_to_step"})
+
+
+class UserInputRoutingTest(unittest.IsolatedAsyncioTestCase):
+    # The undecorated handler, the decorators write workflow run rows and timings
+    user_input_with_step = staticmethod(inspect.unwrap(WorkflowExecutor.user_input_with_step))
+
+    STEP = {"step_id": "s1", "type": "USER_INPUT", "user_interaction": {
+        "user_message": "Pick one",
+        "expected_data_key": ["answer"],
+        "orchestration_rules": [
+            {"condition": "other == 'x'", "go_to_step": "s2"},
+            {"condition": "answer == 'skip'", "go_to_step": "s3"},
+            {"condition": "{{ answer == 'jinja' }}", "go_to_step": "s4"},
+        ],
+    }}
+
+    def workflow_state(self, answer: str) -> WorkflowState:
+        return WorkflowState(workflow_id="w", workflow_run_id="r", start_step_id="s1", input=answer,
+                             is_new_conversation=False)
+
+    async def route(self, answer: str):
+        executor = WorkflowExecutor()
+        workflow_state = await self.user_input_with_step(executor, self.STEP, self.workflow_state(answer))
+        return workflow_state.go_to_step_id
+
+    async def test_python_condition_routes(self):
+        self.assertEqual(await self.route("skip"), "s3")
+
+    async def test_jinja_condition_routes(self):
+        self.assertEqual(await self.route("jinja"), "s4")
+
+    async def test_no_match_keeps_the_configured_next_step(self):
+        self.assertIsNone(await self.route("other"))
+
+    async def test_rendered_condition_has_no_builtins(self):
+        step = {"step_id": "s1", "type": "USER_INPUT", "user_interaction": {
+            "expected_data_key": ["answer"],
+            # The answer is rendered into the condition, which then needs the eval() fallback
+            "orchestration_rules": [{"condition": "{{ answer }}", "go_to_step": "s2"}],
+        }}
+        for answer in ("len('abc') == 3", "__import__('os') is not None"):
+            with self.subTest(answer=answer):
+                with self.assertRaisesRegex(ValueError, "is not defined"):
+                    await self.user_input_with_step(WorkflowExecutor(), step, self.workflow_state(answer))
+
+
+def _system_action(step_id: str, next_step_id: str) -> dict:
+    return {"step_id": step_id, "type": "SYSTEM_ACTION", "next_step_id": next_step_id, "parallel_group_id": "g",
+            "system_action_details": {"name": f"tool_{step_id}", "inputs": {}, "output_mapping": {f"out_{step_id}": "$.value"}}}
+
+
+class ParallelGroupTest(unittest.IsolatedAsyncioTestCase):
+    STEPS = [
+        _system_action("a", "b"),
+        _system_action("b", "f"),
+        {"step_id": "f", "type": "FINAL_RESPONSE",
+         "user_interaction": {"user_message": '{"summary": "{{ out_a }} {{ out_b }}"}'}},
+    ]
+
+    async def asyncSetUp(self):
+        async def execute(query, *params, fetch=False):
+            return "UPDATE 1"
+        # Workflow run rows are not written
+        patcher = patch.object(workflow_decorators._default_postgress(), "execute", execute)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_group_runs_concurrently_and_merges_the_state(self):
+        running, max_running = 0, 0
+
+        async def call_mcp_tool(tool_name, tool_params):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+            return types.SimpleNamespace(content=[types.SimpleNamespace(text=orjson.dumps({"value": tool_name}).decode())])
+
+        executor = WorkflowExecutor()
+        executor.call_mcp_tool = call_mcp_tool
+        workflow_state = WorkflowState(workflow_id="w", workflow_run_id="r", steps=self.STEPS,
+                                       step_ids=[step["step_id"] for step in self.STEPS], start_step_id="a",
+                                       workflow_state={"kept": 1})
+        result = await executor.execute(executor.build_graph(workflow_state), workflow_state)
+
+        self.assertEqual(max_running, 2)
+        self.assertEqual(result["workflow_state"], {"kept": 1, "out_a": "tool_a", "out_b": "tool_b"})
+        self.assertEqual(result["output"], {"summary": "tool_a tool_b"})
+
+    async def test_raising_step_cancels_the_group(self):
+        cancelled = asyncio.Event()
+
+        async def system_control_with_step(step_detail, workflow_state, compiled=None):
+            if step_detail["step_id"] == "a":
+                await asyncio.sleep(0.01)
+                raise RuntimeError("mapping failed")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return workflow_state
+
+        executor = WorkflowExecutor()
+        executor.system_control_with_step = system_control_with_step
+        workflow_state = WorkflowState(workflow_id="w", workflow_run_id="r")
+        result = await asyncio.wait_for(executor.parallel_system_control_with_steps(self.STEPS[:2], workflow_state), 1)
+
+        self.assertTrue(cancelled.is_set())
+        self.assertEqual(result.task_state, "failed")
+        self.assertEqual(result.output, {"summary": "mapping failed"})
+
+
+if __name__ == '__main__':
+    unittest.main()